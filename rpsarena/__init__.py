@@ -6,6 +6,15 @@ import argparse
 import time
 import datetime
 import sys
+import collections
+import io
+import atexit
+import queue
+import threading
+
+from . import binlog
+from .record import DEFAULT_KEYFRAME_EVERY, TrajectoryWriter
+from .snapshot import pack as pack_snapshot, unpack as unpack_snapshot
 
 # ---------------- Configuration defaults ----------------
 DEFAULT_WIDTH, DEFAULT_HEIGHT = 800, 800
@@ -14,6 +23,11 @@ DEFAULT_DELAY_MS = 30         # tick delay; 0 requested -> coerced to 1
 DEFAULT_BACKGROUND = "white"  # color or image filename (windowed mode)
 DEFAULT_BLOCKS = "0"          # "0" none, "<int>" random, or path to JSON
 DEFAULT_LOGFILE = "rps_arena_log.txt"
+DEFAULT_CHECKPOINT_FILE = "rps_arena_checkpoint.bin"  # --checkpoint-every writes here
+DEFAULT_LOG_FORMAT = "text"   # "text" | "binary" (see rpsarena.binlog)
+DEFAULT_LOG_FLUSH = "line"    # "line" | "interval" | "end"
+DEFAULT_LOG_FLUSH_INTERVAL = 1.0  # seconds between flushes with --log-flush interval
+LOG_BUFFER_BYTES = 64 * 1024  # buffered writer hands text to the file once this much is queued
 
 FONT_SIZE = 24                # emoji font size
 RADIUS = 14                   # approximate collision radius for an emoji at FONT_SIZE
@@ -27,6 +41,21 @@ WALL_BOUNCE = 0.9             # bounce damping
 JITTER = 0.25                 # tiny noise to prevent stalemates
 
 POSTGAME_DELAY_MS = 5000      # pause after each game (windowed mode only)
+DEFAULT_VIDEO_FPS = 30        # playback rate of --video output
+MAX_CATCHUP_FRAMES = 5        # missed frames the windowed scheduler makes up before dropping them
+
+# Tick phases timed by --profile-phases, in report order
+PHASES = ("forces", "move", "collisions", "logging", "end_check", "render")
+
+# Per-arena physics settings (override with RPSArena(..., physics={...}))
+DEFAULT_PHYSICS = {
+    "base_speed": BASE_SPEED,
+    "attraction": ATTRACTION,
+    "repulsion": REPULSION,
+    "ally_repel": ALLY_REPEL,
+    "wall_bounce": WALL_BOUNCE,
+    "jitter": JITTER,
+}
 
 DEFAULT_EMOJI = {
     "rock": u"🪨",
@@ -64,6 +93,143 @@ def cap_speed(vx, vy, cap):
         return vx * scale, vy * scale
     return vx, vy
 
+# ---------------- Spatial index ----------------
+class SpatialGrid(object):
+    """
+    Uniform grid of unit indices, bucketed per kind. Rebuilt once per tick
+    (positions and kinds don't change during the force phase).
+
+    Queries break distance ties by list index, so they pick exactly the
+    unit a brute-force scan over the units list would pick.
+    """
+    def __init__(self, width, height, cell_size):
+        self.cell = float(cell_size)
+        self.cols = max(1, int(math.ceil(width / self.cell)))
+        self.rows = max(1, int(math.ceil(height / self.cell)))
+        self.cells = {}   # kind -> {(cx, cy): [unit index, ...]}
+        self.counts = {}  # kind -> number of units
+
+    def _cell_of(self, x, y):
+        cx = min(max(int(x // self.cell), 0), self.cols - 1)
+        cy = min(max(int(y // self.cell), 0), self.rows - 1)
+        return cx, cy
+
+    def rebuild(self, units):
+        cells = {}
+        counts = {}
+        for i, u in enumerate(units):
+            per_kind = cells.get(u.kind)
+            if per_kind is None:
+                per_kind = cells[u.kind] = {}
+            key = self._cell_of(u.x, u.y)
+            bucket = per_kind.get(key)
+            if bucket is None:
+                per_kind[key] = [i]
+            else:
+                bucket.append(i)
+            counts[u.kind] = counts.get(u.kind, 0) + 1
+        self.cells = cells
+        self.counts = counts
+
+    def _ring(self, cx, cy, r):
+        """Yield cell keys at Chebyshev distance r from (cx, cy), clipped to the grid."""
+        if r == 0:
+            yield (cx, cy)
+            return
+        x0, x1 = cx - r, cx + r
+        y0, y1 = cy - r, cy + r
+        for x in range(max(x0, 0), min(x1, self.cols - 1) + 1):
+            if y0 >= 0:
+                yield (x, y0)
+            if y1 < self.rows:
+                yield (x, y1)
+        for y in range(max(y0 + 1, 0), min(y1 - 1, self.rows - 1) + 1):
+            if x0 >= 0:
+                yield (x0, y)
+            if x1 < self.cols:
+                yield (x1, y)
+
+    def nearest(self, units, me, kind):
+        """Return (unit, d2) of the closest unit of `kind` other than `me`, or (None, inf)."""
+        per_kind = self.cells.get(kind)
+        best = None
+        best_i = -1
+        best_d2 = float("inf")
+        if not per_kind:
+            return best, best_d2
+        cx, cy = self._cell_of(me.x, me.y)
+        max_r = max(self.cols, self.rows)
+        r = 0
+        while r <= max_r:
+            # Any cell in ring r is at least (r - 1) cells away along one axis
+            if r > 1:
+                lb = (r - 1) * self.cell
+                if lb * lb > best_d2:
+                    break
+            for key in self._ring(cx, cy, r):
+                bucket = per_kind.get(key)
+                if not bucket:
+                    continue
+                for i in bucket:
+                    u = units[i]
+                    if u is me:
+                        continue
+                    d2 = distance_between(me.x, me.y, u.x, u.y)
+                    if d2 < best_d2 or (d2 == best_d2 and i < best_i):
+                        best_d2 = d2
+                        best_i = i
+                        best = u
+            r += 1
+        return best, best_d2
+
+    def neighbors(self, me, kind):
+        """Return indices of units of `kind` in the 3x3 cells around `me`, in list order."""
+        per_kind = self.cells.get(kind)
+        if not per_kind:
+            return []
+        cx, cy = self._cell_of(me.x, me.y)
+        found = []
+        for x in range(cx - 1, cx + 2):
+            for y in range(cy - 1, cy + 2):
+                bucket = per_kind.get((x, y))
+                if bucket:
+                    found.extend(bucket)
+        found.sort()
+        return found
+
+class BlockIndex(object):
+    """
+    Static grid over the blocks' margin-expanded rectangles. Each cell lists the
+    blocks overlapping it in their original order, so lookups return the same
+    "first block" a linear scan of the block list would.
+    """
+    def __init__(self, blocks, width, height, margin, cell_size):
+        self.margin = margin
+        self.cell = float(cell_size)
+        self.cols = max(1, int(math.ceil(width / self.cell)))
+        self.rows = max(1, int(math.ceil(height / self.cell)))
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+        for b in blocks:
+            cx1, cy1 = self._cell_of(b["x1"] - margin, b["y1"] - margin)
+            cx2, cy2 = self._cell_of(b["x2"] + margin, b["y2"] + margin)
+            for cy in range(cy1, cy2 + 1):
+                for cx in range(cx1, cx2 + 1):
+                    self.cells[cy * self.cols + cx].append(b)
+
+    def _cell_of(self, x, y):
+        cx = min(max(int(x // self.cell), 0), self.cols - 1)
+        cy = min(max(int(y // self.cell), 0), self.rows - 1)
+        return cx, cy
+
+    def first(self, x, y):
+        """Return the first block whose expanded rectangle contains (x, y), or None."""
+        cx, cy = self._cell_of(x, y)
+        margin = self.margin
+        for b in self.cells[cy * self.cols + cx]:
+            if (b["x1"] - margin) <= x <= (b["x2"] + margin) and (b["y1"] - margin) <= y <= (b["y2"] + margin):
+                return b
+        return None
+
 # --- Color utilities (no Tk dependency required) ---
 _COLOR_NAME_MAP = {
     # Common color names (subset)
@@ -128,7 +294,760 @@ def pick_contrast_color(bgcolor, tk_root=None):
         return "white"
     return pick_contrast_color_from_rgb(rgb)
 
+# --- Emoji sprites (optional PIL) ---
+SPRITE_SIZE = RADIUS * 2 + 4  # sprite edge in pixels, about the size of a FONT_SIZE glyph
+
+# Color emoji fonts to rasterize sprites with, and a size each one supports
+# (bitmap emoji fonts only render at fixed sizes; sprites are scaled down after)
+EMOJI_FONTS = (
+    ("/System/Library/Fonts/Apple Color Emoji.ttc", 160),
+    ("C:/Windows/Fonts/seguiemj.ttf", 109),
+    ("/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf", 109),
+    ("/usr/share/fonts/noto/NotoColorEmoji.ttf", 109),
+    ("/usr/share/fonts/google-noto-emoji/NotoColorEmoji.ttf", 109),
+    ("/usr/share/fonts/noto-emoji/NotoColorEmoji.ttf", 109),
+)
+
+def load_emoji_font(fonts=EMOJI_FONTS):
+    """Return a PIL ImageFont for the first usable (path, size) in `fonts`, or None."""
+    from PIL import ImageFont  # type: ignore
+    for path, size in fonts:
+        if not os.path.isfile(path):
+            continue
+        try:
+            return ImageFont.truetype(path, size)
+        except Exception:
+            continue
+    return None
+
+def rasterize_emoji(text, font, size=SPRITE_SIZE):
+    """Render `text` into a size x size RGBA PIL image, trimmed and scaled to fit. None if nothing is drawn."""
+    from PIL import Image, ImageDraw  # type: ignore
+    x0, y0, x1, y1 = font.getbbox(text)
+    img = Image.new("RGBA", (int(x1) + 8, int(y1) + 8), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text((4, 4), text, font=font, embedded_color=True)
+    box = img.getbbox()
+    if box is None:
+        return None
+    img = img.crop(box)
+    scale = float(size) / max(img.size)
+    w, h = max(1, int(round(img.width * scale))), max(1, int(round(img.height * scale)))
+    img = img.resize((w, h), Image.LANCZOS)
+    sprite = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    sprite.paste(img, ((size - w) // 2, (size - h) // 2))
+    return sprite
+
+# --- Batched canvas updates ---
+# Tcl helper that applies a frame's canvas changes in one call from Python:
+# `coords` is a flat list of item x y, `configs` a flat list of item option value.
+RENDER_PROC = "rpsarena_render"
+_RENDER_PROC_TCL = """
+proc %s {canvas coords configs} {
+    foreach {item x y} $coords { $canvas coords $item $x $y }
+    foreach {item option value} $configs { $canvas itemconfigure $item $option $value }
+}
+""" % RENDER_PROC
+
+# ---------------- Log writer ----------------
+class BufferedLogWriter(object):
+    """
+    Writes log text to a file from a background thread.
+
+    Lines go through a bounded queue (writers block if the thread falls
+    behind). Text is handed to the file once LOG_BUFFER_BYTES have
+    accumulated, and flushed every `interval` seconds in "interval" mode or
+    only on close() in "end" mode. close() is registered with atexit, so
+    everything is flushed on normal exit and after Ctrl-C. If the thread
+    fails (e.g. disk full), the next write() or close() raises its error.
+    """
+    _STOP = object()
+
+    def __init__(self, f, mode="interval", interval=DEFAULT_LOG_FLUSH_INTERVAL,
+                 max_bytes=LOG_BUFFER_BYTES, queue_size=10000):
+        self.f = f
+        self.mode = mode
+        self.interval = max(0.001, float(interval))
+        self.max_bytes = max(1, int(max_bytes))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.closed = False
+        self._error = None  # exception that stopped the thread, if any
+        self.thread = threading.Thread(target=self._run, name="rpsarena-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, text):
+        self._put(text)
+
+    def _put(self, item):
+        """Queue `item`, waiting while the queue is full, unless the thread has died."""
+        while True:
+            if self._error is not None:
+                raise self._error
+            if not self.thread.is_alive():
+                raise ValueError("Log writer thread is not running")
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _run(self):
+        try:
+            self._drain()
+        except Exception as e:
+            self._error = e
+
+    def _drain(self):
+        buf = []
+        size = 0
+        last_flush = time.monotonic()
+        while True:
+            timeout = self.interval if self.mode == "interval" else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                break
+            if item is not None:
+                buf.append(item)
+                size += len(item)
+            if size >= self.max_bytes:
+                self._write_all(buf)
+                buf = []
+                size = 0
+            if self.mode == "interval" and time.monotonic() - last_flush >= self.interval:
+                self._write_all(buf)
+                buf = []
+                size = 0
+                self.f.flush()
+                last_flush = time.monotonic()
+        self._write_all(buf)
+        self.f.flush()
+
+    def _write_all(self, buf):
+        if buf:
+            self.f.write(buf[0][:0].join(buf))  # str or bytes, whichever the log uses
+
+    def close(self):
+        """Drain the queue, flush and close the file. Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._put(self._STOP)
+            self.thread.join()
+            if self._error is not None:
+                raise self._error
+        finally:
+            self.f.close()
+
+# ---------------- Blocks file ----------------
+def load_blocks_json(path):
+    """
+    Read a --blocks JSON file and return its blocks as dicts with x1, y1,
+    x2, y2 and color (None if not given). Raises ValueError if it's invalid.
+    """
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except Exception as e:
+        raise ValueError(f"Failed to read JSON file for --blocks: {e}")
+
+    if not isinstance(data, dict) or "blocks" not in data or not isinstance(data["blocks"], list):
+        raise ValueError("Invalid JSON: expected an object with key 'blocks' containing a list.")
+
+    canon = []
+    for i, obj in enumerate(data["blocks"]):
+        if not isinstance(obj, dict):
+            raise ValueError(f"Invalid JSON: blocks[{i}] is not an object.")
+        required = ["top", "left", "width", "height"]
+        for k in required:
+            if k not in obj:
+                raise ValueError(f"Invalid JSON: blocks[{i}] missing required key '{k}'.")
+            if not isinstance(obj[k], int) or obj[k] <= 0:
+                raise ValueError(f"Invalid JSON: blocks[{i}].{k} must be a positive integer.")
+        color = obj.get("color", None)
+        if color is not None and not isinstance(color, str):
+            raise ValueError(f"Invalid JSON: blocks[{i}].color must be a string if provided.")
+        # Convert to x1,y1,x2,y2
+        x1 = float(obj["left"])
+        y1 = float(obj["top"])
+        x2 = x1 + float(obj["width"])
+        y2 = y1 + float(obj["height"])
+        canon.append({"x1": x1, "y1": y1, "x2": x2, "y2": y2, "color": color})
+    return canon
+
 # ---------------- Simulation ----------------
+class Simulation(object):
+    """
+    The game itself: units, blocks and physics, with no window, logging or
+    timing. RPSArena drives one of these; batch runners can use it directly:
+
+        sim = Simulation(800, 800, units_per_kind=50, blocks=3)
+        sim.reset(seed=7)
+        while sim.winner() is None:
+            sim.step()
+
+    `blocks` is a number of random blocks (regenerated on each reset) or a
+    list of block dicts {'x1','y1','x2','y2','color'} reused as-is.
+    """
+    def __init__(self, width, height, units_per_kind,
+                 kinds=None, beats=None, loses_to=None, blocks=None,
+                 physics=None, spatial_grid=False, placement="random"):
+        self.width = int(width)
+        self.height = int(height)
+        self.beats = beats if beats is not None else DEFAULT_BEATS
+        self.loses_to = loses_to if loses_to is not None else DEFAULT_LOSES_TO
+        self.kinds_order = list(kinds) if kinds is not None else sorted(self.beats.keys())
+        self.units_per_kind = max(1, int(units_per_kind))
+
+        # Physics constants (module defaults, overridable per simulation)
+        physics = physics if physics is not None else {}
+        for key in physics:
+            if key not in DEFAULT_PHYSICS:
+                raise ValueError(f"Unknown physics setting '{key}'. Expected one of: {', '.join(DEFAULT_PHYSICS)}")
+        self.physics = dict(DEFAULT_PHYSICS, **physics)
+        self.base_speed = float(self.physics["base_speed"])
+        self.attraction = float(self.physics["attraction"])
+        self.repulsion = float(self.physics["repulsion"])
+        self.ally_repel = float(self.physics["ally_repel"])
+        self.wall_bounce = float(self.physics["wall_bounce"])
+        self.jitter = float(self.physics["jitter"])
+
+        # Blocks (obstacles): a random count, or fixed block dicts
+        if blocks is None or isinstance(blocks, int):
+            self.blocks_count = max(0, int(blocks or 0))
+            self.blocks_fixed = None
+        else:
+            self.blocks_count = 0
+            self.blocks_fixed = list(blocks)
+        self.blocks = []
+        self.block_index = None      # BlockIndex over self.blocks, rebuilt each reset
+
+        # Optional spatial index for neighbour queries (None = brute-force scans)
+        self.grid = SpatialGrid(self.width, self.height, MIN_SEP) if spatial_grid else None
+        self.placement = placement  # "random" (rejection sampling) or "poisson"
+
+        # This simulation's own RNG stream (reset(seed) seeds it), so
+        # simulations in one process don't disturb each other's draws
+        self.rng = random.Random()
+
+        self.units = []
+        self.step_num = 0
+        # Units per kind and number of kinds left, updated on each conversion
+        self.kind_counts = dict((k, 0) for k in self.kinds_order)
+        self.kinds_left = 0
+        # Units converted during the last tick
+        self.converted_units = []
+        # Units placed ignoring the minimum separation at the last reset (arena full)
+        self.placement_fallbacks = 0
+        # Unit indices sorted by x, kept between ticks for the collision broadphase
+        self._sweep_order = None
+
+    # --- Public API ---
+    def reset(self, seed=None):
+        """Start a new game: seed the RNG (if given), lay out blocks and place units."""
+        if seed is not None:
+            self.rng.seed(seed)
+        self._generate_blocks()
+        self._index_blocks()
+
+        self.units = []
+        self.step_num = 0
+        self.converted_units = []
+        self._sweep_order = None
+
+        # Exactly units_per_kind of each kind
+        kinds = []
+        for k in self.kinds_order:
+            kinds.extend([k] * self.units_per_kind)
+        self.rng.shuffle(kinds)
+
+        if self.placement == "poisson":
+            placed = self._place_poisson(kinds)
+        else:
+            placed = self._place_random(kinds)
+
+        # If we couldn't place all with constraints, place remaining without min-sep but still outside blocks
+        for k in kinds[placed:]:
+            tries = 0
+            while True and tries < 2000:
+                tries += 1
+                x = self.rng.uniform(RADIUS + 2, self.width - RADIUS - 2)
+                y = self.rng.uniform(RADIUS + 2, self.height - RADIUS - 2)
+                if not self._point_in_any_block(x, y, margin=RADIUS):
+                    break
+            self._spawn_unit(k, x, y)
+        self.placement_fallbacks = len(kinds) - placed
+        self.recount()
+
+    def tick(self, timed=None):
+        """
+        Advance one step: forces, movement, then conversions. Returns True on
+        any conversion. `timed(phase, fn, *args)`, if given, wraps each phase.
+        """
+        self.step_num += 1
+        self.converted_units = []
+        if timed is None:
+            self._apply_all_forces()
+            self._move_all()
+            return self._handle_collisions_and_conversions()
+        timed("forces", self._apply_all_forces)
+        timed("move", self._move_all)
+        return timed("collisions", self._handle_collisions_and_conversions)
+
+    def step(self, n=1):
+        """Advance up to n ticks, stopping early if the game ends. Returns True on any conversion."""
+        converted = False
+        for _ in range(n):
+            if self.tick():
+                converted = True
+                if self.winner() is not None:
+                    break
+        return converted
+
+    def counts(self):
+        """Units per kind, as {kind: count} over all kinds."""
+        return dict(self.kind_counts)
+
+    def winner(self):
+        """The remaining kind once only one is left, else None."""
+        if self.kinds_left != 1:
+            return None
+        for k, n in self.kind_counts.items():
+            if n:
+                return k
+
+    def recount(self):
+        """Rebuild the per-kind counters from the units (after changing unit kinds directly)."""
+        counts = dict((k, 0) for k in self.kinds_order)
+        for u in self.units:
+            counts[u.kind] += 1
+        self.kind_counts = counts
+        self.kinds_left = sum(1 for n in counts.values() if n)
+
+    def snapshot(self, extra=None):
+        """
+        The game's full state (units, blocks, step and RNG) as compact bytes;
+        see rpsarena.snapshot. `extra` is any JSON-serializable state of the
+        caller's, handed back by restore().
+        """
+        meta = {"size": [self.width, self.height], "kinds": list(self.kinds_order),
+                "physics": self.physics, "step": self.step_num, "blocks": self.blocks,
+                "extra": extra}
+        return pack_snapshot(meta, self.units, self.rng.getstate())
+
+    def restore(self, data):
+        """
+        Continue from snapshot() bytes taken with the same size, kinds and
+        physics; the following ticks are exactly those the original played.
+        Returns the snapshot's `extra`.
+        """
+        meta, (kinds, xs, ys, vxs, vys), rng_state = unpack_snapshot(data)
+        if meta["size"] != [self.width, self.height] or meta["kinds"] != self.kinds_order:
+            raise ValueError(f"Snapshot is of a {meta['size'][0]}x{meta['size'][1]} game with kinds "
+                             f"{','.join(meta['kinds'])}, not {self.width}x{self.height} with "
+                             f"{','.join(self.kinds_order)}.")
+        if meta["physics"] != self.physics:
+            raise ValueError("Snapshot was taken with different physics settings.")
+        self.blocks = [dict(b) for b in meta["blocks"]]
+        self._index_blocks()
+        self.units = [Emoji(*unit) for unit in zip(kinds, xs, ys, vxs, vys)]
+        self.step_num = meta["step"]
+        self.rng.setstate(rng_state)
+        self.converted_units = []
+        self._sweep_order = None
+        self.recount()
+        return meta["extra"]
+
+    # --- Blocks (obstacles) ---
+    def _generate_blocks(self):
+        """Generate random blocks anew, or copy the fixed blocks (each reset)."""
+        self.blocks = []
+        if self.blocks_fixed is not None:
+            for b in self.blocks_fixed:
+                self.blocks.append({
+                    "x1": float(b["x1"]), "y1": float(b["y1"]),
+                    "x2": float(b["x2"]), "y2": float(b["y2"]),
+                    "color": b.get("color")
+                })
+            return
+        if self.blocks_count <= 0:
+            return
+        W, H = self.width, self.height
+        max_area = 0.20 * (W * H)
+        min_w, max_w = int(0.08 * W), int(0.40 * W)
+        min_h, max_h = int(0.08 * H), int(0.40 * H)
+
+        attempts = 0
+        target = self.blocks_count
+        while len(self.blocks) < target and attempts < target * 30:
+            attempts += 1
+            w = self.rng.randint(min_w, max_w)
+            h = self.rng.randint(min_h, max_h)
+            # Enforce per-block area cap
+            if w * h > max_area:
+                h = max(int(max_area / max(w, 1)), min_h)
+                if h < min_h:
+                    continue
+            x1 = self.rng.randint(RADIUS + 2, max(RADIUS + 2, W - w - RADIUS - 2))
+            y1 = self.rng.randint(RADIUS + 2, max(RADIUS + 2, H - h - RADIUS - 2))
+            x2 = x1 + w
+            y2 = y1 + h
+            if x2 - x1 >= 4 and y2 - y1 >= 4:
+                # No color: the arena draws it in its auto-contrast color
+                self.blocks.append({
+                    "x1": float(x1), "y1": float(y1),
+                    "x2": float(x2), "y2": float(y2),
+                    "color": None
+                })
+
+    def _index_blocks(self):
+        """Build the block lookup grid for the unit-radius margin used by placement and movement."""
+        if self.blocks:
+            self.block_index = BlockIndex(self.blocks, self.width, self.height, RADIUS, MIN_SEP * 2)
+        else:
+            self.block_index = None
+
+    def _point_in_any_block(self, x, y, margin=0.0):
+        """Return True if point (x,y) is inside any block expanded by margin."""
+        if not self.blocks:
+            return False
+        if self.block_index is not None and margin == self.block_index.margin:
+            return self.block_index.first(x, y) is not None
+        for b in self.blocks:
+            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
+            if (x1 - margin) <= x <= (x2 + margin) and (y1 - margin) <= y <= (y2 + margin):
+                return True
+        return False
+
+    def _colliding_block(self, x, y, margin=0.0):
+        """Return the first block dict containing point (x,y) with margin, or None."""
+        if not self.blocks:
+            return None
+        if self.block_index is not None and margin == self.block_index.margin:
+            return self.block_index.first(x, y)
+        for b in self.blocks:
+            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
+            if (x1 - margin) <= x <= (x2 + margin) and (y1 - margin) <= y <= (y2 + margin):
+                return b
+        return None
+
+    # --- Placement ---
+    def _spawn_unit(self, kind, x, y):
+        """Create a unit at (x, y) with a random heading and speed."""
+        angle = self.rng.uniform(0, 2*math.pi)
+        speed = self.rng.uniform(0, self.base_speed)
+        vx, vy = math.cos(angle)*speed, math.sin(angle)*speed
+        self.units.append(Emoji(kind, x, y, vx, vy))
+
+    def _place_random(self, kinds):
+        """Rejection-sample uniform points; returns how many units were placed."""
+        # Place with minimum separation (best-effort) and outside blocks (margin=RADIUS)
+        placed = 0
+        attempts = 0
+        max_attempts = len(kinds) * 500
+        while placed < len(kinds) and attempts < max_attempts:
+            attempts += 1
+            x = self.rng.uniform(RADIUS + 2, self.width - RADIUS - 2)
+            y = self.rng.uniform(RADIUS + 2, self.height - RADIUS - 2)
+
+            if self._point_in_any_block(x, y, margin=RADIUS):
+                continue
+
+            too_close = False
+            for u in self.units:
+                if distance_between(x, y, u.x, u.y) < (MIN_SEP * MIN_SEP):
+                    too_close = True
+                    break
+            if too_close:
+                continue
+
+            self._spawn_unit(kinds[placed], x, y)
+            placed += 1
+        return placed
+
+    def _place_poisson(self, kinds):
+        """
+        Poisson-disk placement on a background grid of MIN_SEP/sqrt(2) cells
+        (at most one unit per cell). Uniform darts are thrown first; once they
+        stop landing, Bridson-style growth fills the gaps around placed units
+        until no active unit has room left. Returns how many units were placed.
+        """
+        lo_x, hi_x = RADIUS + 2, self.width - RADIUS - 2
+        lo_y, hi_y = RADIUS + 2, self.height - RADIUS - 2
+        cell = MIN_SEP / math.sqrt(2)
+        cols = int(math.ceil(self.width / cell)) + 1
+        grid = {}
+        sep2 = MIN_SEP * MIN_SEP
+
+        def fits(x, y):
+            if not (lo_x <= x <= hi_x and lo_y <= y <= hi_y):
+                return False
+            if self._point_in_any_block(x, y, margin=RADIUS):
+                return False
+            cx, cy = int(x // cell), int(y // cell)
+            for gy in range(cy - 2, cy + 3):
+                for gx in range(cx - 2, cx + 3):
+                    u = grid.get(gy * cols + gx)
+                    if u is not None and distance_between(x, y, u.x, u.y) < sep2:
+                        return False
+            return True
+
+        def accept(x, y):
+            self._spawn_unit(kinds[len(active_all)], x, y)
+            u = self.units[-1]
+            grid[int(y // cell) * cols + int(x // cell)] = u
+            active_all.append(u)
+
+        active_all = []
+        # Uniform darts until they stop landing (keeps the layout spread out)
+        misses = 0
+        while len(active_all) < len(kinds) and misses < 30:
+            x = self.rng.uniform(lo_x, hi_x)
+            y = self.rng.uniform(lo_y, hi_y)
+            if fits(x, y):
+                accept(x, y)
+                misses = 0
+            else:
+                misses += 1
+
+        # Bridson growth: try k points in the annulus [MIN_SEP, 2*MIN_SEP) around active units
+        active = list(active_all)
+        while len(active_all) < len(kinds) and active:
+            i = self.rng.randrange(len(active))
+            base = active[i]
+            for _ in range(30):
+                angle = self.rng.uniform(0, 2*math.pi)
+                dist = self.rng.uniform(MIN_SEP, 2 * MIN_SEP)
+                x = base.x + math.cos(angle) * dist
+                y = base.y + math.sin(angle) * dist
+                if fits(x, y):
+                    accept(x, y)
+                    active.append(self.units[-1])
+                    break
+            else:
+                active[i] = active[-1]
+                active.pop()
+        return len(active_all)
+
+    # --- Behavior/physics ---
+    def _force_closest_choice(self, me):
+        prey_kind = self.beats[me.kind]
+        predator_kind = self.loses_to[me.kind]
+
+        closest_prey = None
+        closest_pred = None
+        best_prey_d2 = float("inf")
+        best_pred_d2 = float("inf")
+
+        # Grid queries match the scan below except when prey and predator share a kind
+        use_grid = self.grid is not None and prey_kind != predator_kind
+        if use_grid:
+            closest_prey, best_prey_d2 = self.grid.nearest(self.units, me, prey_kind)
+            closest_pred, best_pred_d2 = self.grid.nearest(self.units, me, predator_kind)
+        else:
+            for u in self.units:
+                if u is me:
+                    continue
+                d2 = distance_between(me.x, me.y, u.x, u.y)
+                if u.kind == prey_kind and d2 < best_prey_d2:
+                    best_prey_d2 = d2
+                    closest_prey = u
+                elif u.kind == predator_kind and d2 < best_pred_d2:
+                    best_pred_d2 = d2
+                    closest_pred = u
+
+        fx, fy = 0.0, 0.0
+        if closest_prey is not None and closest_pred is not None:
+            if best_prey_d2 <= best_pred_d2:
+                dx, dy = normalize(closest_prey.x - me.x, closest_prey.y - me.y)
+                fx += dx * self.attraction
+                fy += dy * self.attraction
+            else:
+                dx, dy = normalize(me.x - closest_pred.x, me.y - closest_pred.y)
+                fx += dx * self.repulsion
+                fy += dy * self.repulsion
+        elif closest_prey is not None:
+            dx, dy = normalize(closest_prey.x - me.x, closest_prey.y - me.y)
+            fx += dx * self.attraction
+            fy += dy * self.attraction
+        elif closest_pred is not None:
+            dx, dy = normalize(me.x - closest_pred.x, me.y - closest_pred.y)
+            fx += dx * self.repulsion
+            fy += dy * self.repulsion
+
+        # mild ally repel within short range
+        if self.grid is not None:
+            allies = [self.units[i] for i in self.grid.neighbors(me, me.kind)]
+        else:
+            allies = self.units
+        for u in allies:
+            if u is me or u.kind != me.kind:
+                continue
+            d2 = distance_between(me.x, me.y, u.x, u.y)
+            if d2 < (MIN_SEP * MIN_SEP):
+                dx, dy = normalize(me.x - u.x, me.y - u.y)
+                denom = max(math.sqrt(d2), 1.0)
+                strength = self.ally_repel * (float(MIN_SEP) / denom)
+                fx += dx * strength
+                fy += dy * strength
+
+        fx += self.rng.uniform(-self.jitter, self.jitter)
+        fy += self.rng.uniform(-self.jitter, self.jitter)
+        return fx, fy
+
+    def _index_units(self):
+        """Rebuild the spatial grid (if enabled) before the force phase of a tick."""
+        if self.grid is not None:
+            self.grid.rebuild(self.units)
+
+    def _apply_all_forces(self):
+        self._index_units()
+        for u in self.units:
+            self._apply_forces(u)
+
+    def _move_all(self):
+        for u in self.units:
+            self._move(u)
+
+    def _apply_forces(self, u):
+        fx, fy = self._force_closest_choice(u)
+        u.vx += fx
+        u.vy += fy
+        u.vx, u.vy = cap_speed(u.vx, u.vy, self.base_speed)
+
+    def _move(self, u):
+        # Proposed movement
+        nx = u.x + u.vx
+        ny = u.y + u.vy
+
+        # Walls
+        bounced = False
+        if nx < RADIUS:
+            nx = RADIUS + (RADIUS - nx)
+            u.vx = -u.vx * self.wall_bounce
+            bounced = True
+        elif nx > self.width - RADIUS:
+            nx = (self.width - RADIUS) - (nx - (self.width - RADIUS))
+            u.vx = -u.vx * self.wall_bounce
+            bounced = True
+        if ny < RADIUS:
+            ny = RADIUS + (RADIUS - ny)
+            u.vy = -u.vy * self.wall_bounce
+            bounced = True
+        elif ny > self.height - RADIUS:
+            ny = (self.height - RADIUS) - (ny - (self.height - RADIUS))
+            u.vy = -u.vy * self.wall_bounce
+            bounced = True
+
+        # Blocks collision — prevent center from entering any expanded rectangle
+        for _ in range(2):
+            b = self._colliding_block(nx, ny, margin=RADIUS)
+            if b is None:
+                break
+            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
+            left = x1 - RADIUS
+            right = x2 + RADIUS
+            top = y1 - RADIUS
+            bottom = y2 + RADIUS
+
+            dx_left = abs(nx - left)
+            dx_right = abs(nx - right)
+            dy_top = abs(ny - top)
+            dy_bottom = abs(ny - bottom)
+
+            m = min(dx_left, dx_right, dy_top, dy_bottom)
+            if m == dx_left:
+                nx = left
+                u.vx = -abs(u.vx) * self.wall_bounce
+            elif m == dx_right:
+                nx = right
+                u.vx = abs(u.vx) * self.wall_bounce
+            elif m == dy_top:
+                ny = top
+                u.vy = -abs(u.vy) * self.wall_bounce
+            else:
+                ny = bottom
+                u.vy = abs(u.vy) * self.wall_bounce
+            bounced = True
+
+        if bounced:
+            u.vx += self.rng.uniform(-0.2, 0.2)
+            u.vy += self.rng.uniform(-0.2, 0.2)
+            u.vx, u.vy = cap_speed(u.vx, u.vy, self.base_speed)
+
+        u.x, u.y = nx, ny
+
+    def _touching_pairs(self, r2):
+        """
+        Sweep-and-prune broadphase: return (i, j) index pairs with i < j whose
+        centers are within sqrt(r2), sorted in the order a nested i<j scan visits them.
+        """
+        units = self.units
+        n = len(units)
+        order = self._sweep_order
+        if order is None or len(order) != n:
+            order = sorted(range(n), key=lambda k: units[k].x)
+        else:
+            # Units move little per tick, so insertion sort is close to linear
+            for k in range(1, n):
+                idx = order[k]
+                x = units[idx].x
+                m = k - 1
+                while m >= 0 and units[order[m]].x > x:
+                    order[m + 1] = order[m]
+                    m -= 1
+                order[m + 1] = idx
+        self._sweep_order = order
+
+        pairs = []
+        for k in range(n):
+            i = order[k]
+            a = units[i]
+            for m in range(k + 1, n):
+                j = order[m]
+                b = units[j]
+                dx = b.x - a.x
+                if dx * dx > r2:
+                    break
+                if i < j:
+                    if distance_between(a.x, a.y, b.x, b.y) <= r2:
+                        pairs.append((i, j))
+                elif distance_between(b.x, b.y, a.x, a.y) <= r2:
+                    pairs.append((j, i))
+        pairs.sort()
+        return pairs
+
+    def _handle_collisions_and_conversions(self):
+        r2 = float((RADIUS * 1.1) ** 2)
+        converted = False
+        # Positions are fixed during this phase, so only the touching pairs can
+        # convert; visiting them in i<j order keeps conversion chains unchanged.
+        for i, j in self._touching_pairs(r2):
+            a = self.units[i]
+            b = self.units[j]
+            if a.kind != b.kind:
+                if self.beats[a.kind] == b.kind:
+                    self._convert(b, a.kind)
+                    converted = True
+                elif self.beats[b.kind] == a.kind:
+                    self._convert(a, b.kind)
+                    converted = True
+        return converted
+
+    def _convert(self, u, kind):
+        """Turn unit u into `kind` (which is present: the converter has it), keeping the counters current."""
+        counts = self.kind_counts
+        counts[u.kind] -= 1
+        if counts[u.kind] == 0:
+            self.kinds_left -= 1
+        counts[kind] += 1
+        u.kind = kind
+        self.converted_units.append(u)
+
+# ---------------- Arena (window, logging, game loop) ----------------
 class RPSArena(object):
     def __init__(self, root, width, height, units_per_kind, delay_ms,
                  emoji=None, beats=None, loses_to=None,
@@ -136,7 +1055,15 @@ class RPSArena(object):
                  log_filename=DEFAULT_LOGFILE, no_log=False,
                  ff_enabled=True,
                  background_color=DEFAULT_BACKGROUND, countdown_s=0,
-                 windowless=False, quiet=False, showstats=False, blocks=DEFAULT_BLOCKS):
+                 windowless=False, quiet=False, showstats=False, blocks=DEFAULT_BLOCKS,
+                 spatial_grid=False, engine="python", placement="random", jobs=1,
+                 physics=None, log_flush=DEFAULT_LOG_FLUSH,
+                 log_flush_interval=DEFAULT_LOG_FLUSH_INTERVAL, log_format=DEFAULT_LOG_FORMAT,
+                 profile_phases=False, profile_json=None, sprites=False,
+                 steps_per_frame=1, target_fps=0,
+                 video=None, video_every=1, video_fps=DEFAULT_VIDEO_FPS,
+                 record=None, record_compression="zlib", record_keyframe_every=DEFAULT_KEYFRAME_EVERY,
+                 checkpoint_every=0, checkpoint_file=DEFAULT_CHECKPOINT_FILE, resume=None):
         self.root = root
         self.windowless = windowless
         self.quiet = quiet
@@ -163,6 +1090,17 @@ class RPSArena(object):
         self.ff_enabled = bool(ff_enabled)
         self.ff_active = False
 
+        # Frames (windowed): physics ticks per rendered frame. With a target FPS,
+        # frames come every 1000/fps ms and each runs the ticks that are due at
+        # one per delay_ms, within the frame's time budget.
+        self.steps_per_frame = max(1, int(steps_per_frame))
+        self.target_fps = max(0.0, float(target_fps))
+        self._tick_debt = 0.0     # ticks due but not yet run (target FPS mode)
+        self._render_s = 0.0      # duration of the last render, in seconds
+        # Frames start at fixed perf_counter deadlines (None = re-anchor at the next frame)
+        self._frame_deadline = None
+        self._sched_stats = None  # late frames / overrun / skipped ticks for the current game
+
         # Countdown (ignored in windowless mode)
         self.countdown_s = 0 if windowless else max(0, int(countdown_s))
         self._in_countdown = False
@@ -173,42 +1111,129 @@ class RPSArena(object):
         # Stats overlay
         self._stats_item = None
 
+        # Canvas text/image items for units, reused across games (windowed)
+        self._unit_items = []
+
         # Blocks (obstacles)
-        # Internal: list of dicts {'x1','y1','x2','y2','color'}
-        self.blocks = []
-        self.block_items = []        # canvas ids
-        self.block_color = "white"   # default for random blocks
+        self.block_items = []        # canvas ids, reused across games
+        self._block_shapes = None    # (x1, y1, x2, y2, color) per drawn block
         self.blocks_mode = "none"    # "none" | "random" | "json"
         self.blocks_count = 0
         self.blocks_json = None      # canonical blocks from JSON (persistent across resets)
         self.blocks_json_path = None
+        self.blocks_option = blocks  # as given, for worker processes
 
         self._parse_blocks_option(blocks)
 
+        # Multi-game controls
+        self.num_games = max(0, int(num_games))  # 0 = unlimited
+        self.games_played = 0
+
+        # Offscreen video export (windowless only): one file per game, see rpsarena.video
+        self.video = None         # output path, with {seed} when several games are played
+        self.video_every = max(1, int(video_every))
+        self.video_fps = max(1.0, float(video_fps))
+        self._video_renderer = None
+        self._video = None        # VideoWriter for the current game
+        if video is not None and windowless:
+            from . import video as video_export
+            video_export.check_output(video)
+            if "{seed}" not in video and self.num_games != 1:
+                root_path, ext = os.path.splitext(video)
+                video = root_path + "_{seed}" + ext
+            self.video = video
+
+        # Trajectory recording: every tick's positions and kinds, see rpsarena.record
+        self.record = record
+        self.record_compression = record_compression
+        self.record_keyframe_every = max(1, int(record_keyframe_every))
+        self._recorder = None
+        if record is not None:
+            self._recorder = TrajectoryWriter(self._open_record_file(), compression=record_compression,
+                                              keyframe_every=self.record_keyframe_every)
+
+        # The game itself (units, blocks, physics); this class adds the window, logs and game loop
+        self.sim = Simulation(self.width, self.height, self.units_per_kind,
+                              kinds=self.kinds_order, beats=self.beats, loses_to=self.loses_to,
+                              blocks=self.blocks_json if self.blocks_mode == "json" else self.blocks_count,
+                              physics=physics, spatial_grid=spatial_grid, placement=placement)
+        self.physics = self.sim.physics
+        self.placement = placement
+        self.spatial_grid = bool(spatial_grid)
+
         # Background image state (windowed)
         self._bg_item = None
         self._bg_photo = None
         self._bg_is_image = False
         self._bg_contrast_color = "white"  # for images, computed from luminance
 
-        # Multi-game controls
-        self.num_games = max(0, int(num_games))  # 0 = unlimited
-        self.games_played = 0
-
         # Seed handling
         self.fixed_seed = fixed_seed
         if self.fixed_seed is None:
-            self.current_seed = random.randint(1, 1000000)
+            self.current_seed = random.Random().randint(1, 1000000)
         else:
             self.current_seed = int(self.fixed_seed)
-        random.seed(self.current_seed)
+
+        # Checkpoints (serial windowless runs): snapshot() to checkpoint_file every
+        # checkpoint_every ticks. --resume restores one here, before the log header
+        # (which shows its seed); the game carries on when the game loop starts
+        self.checkpoint_every = max(0, int(checkpoint_every))
+        self.checkpoint_file = checkpoint_file
+        self._engine = None            # NumpyEngine playing the current game, if any
+        self._engine_rng_state = None  # its RNG state, for a numpy game resumed mid-game
+        self.game_start_time = time.time()
+        self.resumed = False
+        self.resume_file = None
+        self.resumed_at = None  # step the first game was resumed at (logged in the header)
+        if resume is not None and windowless:
+            with open(resume, "rb") as f:
+                self.restore(f.read())
+            self.resumed = True
+            self.resume_file = resume
+            self.resumed_at = self.step_num
+
+        # Simulation engine (windowless only): "python" or "numpy". Resolved
+        # before the log header, which records it; warnings are logged after it
+        self.engine = engine
+        self._engine_cls = None
+        engine_warnings = []
+        if self.engine == "numpy":
+            if not self.windowless:
+                engine_warnings.append("warning: --engine numpy only applies to windowless runs; using the python engine.")
+                self.engine = "python"
+            else:
+                try:
+                    from .engine_numpy import NumpyEngine
+                    self._engine_cls = NumpyEngine
+                except ImportError:
+                    engine_warnings.append("warning: NumPy not available; using the python engine.")
+                    self.engine = "python"
 
         # Logging
         self.no_log = bool(no_log)
         self.log_filename = log_filename
-        self.logf = open(self.log_filename, "a") if not self.no_log else None
+        self.log_format = log_format
+        self._binary_log = (self.log_format == "binary")
+        log_mode = "ab" if self._binary_log else "a"
+        self.logf = open(self.log_filename, log_mode) if not self.no_log else None
+        # "line" flushes every line here; "interval"/"end" hand lines to a writer thread
+        self.log_flush = log_flush
+        self._log_writer = None
+        if self.logf is not None and self.log_flush != "line":
+            self._log_writer = BufferedLogWriter(self.logf, mode=self.log_flush,
+                                                 interval=log_flush_interval)
         self._write_log_header()
 
+        for warning in engine_warnings:
+            self._log(warning)
+        if resume is not None and not self.windowless:
+            self._log("warning: --resume only applies to windowless runs; ignored.")
+        if self.resumed:
+            self._log(f"resume: game {self.games_played + 1} (seed {self.current_seed}) "
+                      f"at step {self.step_num} from {resume}")
+        if video is not None and not self.windowless:
+            self._log("warning: --video only applies to windowless runs; ignored.")
+
         # UI only if not windowless
         if not self.windowless:
             # Import tkinter only in windowed mode
@@ -220,6 +1245,7 @@ class RPSArena(object):
                 bg="white", highlightthickness=0
             )
             self.canvas.pack(fill="both", expand=True)
+            self.canvas.tk.eval(_RENDER_PROC_TCL)
 
             # Apply background (color or image) and pick text color
             self._apply_background(self.bg_source)
@@ -229,27 +1255,46 @@ class RPSArena(object):
                 self.ui_text_color = self._bg_contrast_color
             else:
                 self.ui_text_color = pick_contrast_color(self.bg_source, tk_root=self.root)
-
-            # Block color default for random blocks: auto-contrast with background
-            self.block_color = self.ui_text_color
         else:
             self.canvas = None
             self.ui_text_color = "white"  # unused in windowless
-            self.block_color = "white"
 
-        self.units = []
+        # How unit items show their kind: a pre-rasterized image, or the emoji as text
+        self._sprites = self._make_sprites() if sprites and self.canvas is not None else None
+        if self._sprites is not None:
+            self._unit_looks = dict((k, ("-image", str(self._sprites[k]))) for k in self.kinds_order)
+        else:
+            self._unit_looks = dict((k, ("-text", self.emoji[k])) for k in self.kinds_order)
+
         self._restart_after_id = None
 
-        # Per-game counters
-        self.step_num = 0
-        self.game_start_time = time.time()
+        # Worker processes for windowless games (1 = play serially in this process)
+        self.jobs = max(1, int(jobs))
+        if self.resumed and self.jobs > 1:
+            self._log("warning: a resumed run plays serially; -j ignored.")
+            self.jobs = 1
+        if self.checkpoint_every and (not self.windowless or self.jobs > 1):
+            self._log("warning: --checkpoint-every only applies to serial windowless runs; ignored.")
+            self.checkpoint_every = 0
+
+        # Per-phase tick timers: None when disabled, else {phase: [ns per tick]} for the current game
+        self.profile_json = profile_json
+        self.profile_phases = bool(profile_phases) or profile_json is not None
+        self._phase_times = None
+        self._game_ticks = 0  # ticks run in this game (or since it was resumed): the sample count
 
         # First game
-        self.reset()
         if not self.windowless:
+            self.reset()
             self._maybe_start_countdown()
             self.step()
+        elif self.jobs > 1:
+            self.run_windowless_parallel()
         else:
+            if self.resumed:
+                self._start_game()
+            else:
+                self.reset()
             self.run_windowless()
 
     # ---------------- Blocks option parsing ----------------
@@ -276,40 +1321,27 @@ class RPSArena(object):
         if not os.path.isfile(path):
             raise ValueError(f"--blocks expects an integer or a JSON file path. Not found: {path}")
 
-        # Load and validate JSON
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-        except Exception as e:
-            raise ValueError(f"Failed to read JSON file for --blocks: {e}")
-
-        if not isinstance(data, dict) or "blocks" not in data or not isinstance(data["blocks"], list):
-            raise ValueError("Invalid JSON: expected an object with key 'blocks' containing a list.")
-
-        canon = []
-        for i, obj in enumerate(data["blocks"]):
-            if not isinstance(obj, dict):
-                raise ValueError(f"Invalid JSON: blocks[{i}] is not an object.")
-            required = ["top", "left", "width", "height"]
-            for k in required:
-                if k not in obj:
-                    raise ValueError(f"Invalid JSON: blocks[{i}] missing required key '{k}'.")
-                if not isinstance(obj[k], int) or obj[k] <= 0:
-                    raise ValueError(f"Invalid JSON: blocks[{i}].{k} must be a positive integer.")
-            color = obj.get("color", None)
-            if color is not None and not isinstance(color, str):
-                raise ValueError(f"Invalid JSON: blocks[{i}].color must be a string if provided.")
-            # Convert to x1,y1,x2,y2
-            x1 = float(obj["left"])
-            y1 = float(obj["top"])
-            x2 = x1 + float(obj["width"])
-            y2 = y1 + float(obj["height"])
-            canon.append({"x1": x1, "y1": y1, "x2": x2, "y2": y2, "color": color})
-
         self.blocks_mode = "json"
-        self.blocks_json = canon
+        self.blocks_json = load_blocks_json(path)
         self.blocks_json_path = path
 
+    # ---------------- Simulation state ----------------
+    @property
+    def units(self):
+        return self.sim.units
+
+    @property
+    def blocks(self):
+        return self.sim.blocks
+
+    @property
+    def step_num(self):
+        return self.sim.step_num
+
+    @step_num.setter
+    def step_num(self, value):
+        self.sim.step_num = value
+
     # ---------------- Background handling (windowed) ----------------
     def _apply_background(self, source):
         """Apply a color or an image (stretched) as the canvas background."""
@@ -345,9 +1377,7 @@ class RPSArena(object):
                     means = stat.mean  # [R,G,B] 0..255
                     self._bg_contrast_color = pick_contrast_color_from_rgb(tuple(int(m) for m in means))
                     self._bg_photo = ImageTk.PhotoImage(img)
-                    self._bg_item = self.canvas.create_image(0, 0, image=self._bg_photo, anchor="nw")
-                    self.canvas.lower(self._bg_item)  # send to back
-                    self._bg_is_image = True
+                    self._show_bg_photo()
                     return
                 except Exception as e:
                     self._log(f"warning: failed to load image '{source}' via PIL: {e}; falling back to Tk PhotoImage")
@@ -355,9 +1385,7 @@ class RPSArena(object):
             # Fallback: Tk PhotoImage (may not resize)
             try:
                 self._bg_photo = tk.PhotoImage(file=source)  # type: ignore
-                self._bg_item = self.canvas.create_image(0, 0, image=self._bg_photo, anchor="nw")
-                self.canvas.lower(self._bg_item)
-                self._bg_is_image = True
+                self._show_bg_photo()
                 # Contrast fallback—assume dark average -> use white
                 self._bg_contrast_color = "white"
                 self._log("warning: PIL not available; background image not stretched.")
@@ -375,147 +1403,201 @@ class RPSArena(object):
             self._log(f"warning: invalid background '{source}', defaulting to white.")
         self._bg_is_image = False
 
-    # ---------------- Blocks (obstacles) ----------------
-    def _generate_blocks_random(self):
-        """Generate random blocks anew (each reset)."""
-        self.blocks = []
-        if self.blocks_mode != "random" or self.blocks_count <= 0:
-            return
-        W, H = self.width, self.height
-        max_area = 0.20 * (W * H)
-        min_w, max_w = int(0.08 * W), int(0.40 * W)
-        min_h, max_h = int(0.08 * H), int(0.40 * H)
-
-        attempts = 0
-        target = self.blocks_count
-        while len(self.blocks) < target and attempts < target * 30:
-            attempts += 1
-            w = random.randint(min_w, max_w)
-            h = random.randint(min_h, max_h)
-            # Enforce per-block area cap
-            if w * h > max_area:
-                h = max(int(max_area / max(w, 1)), min_h)
-                if h < min_h:
-                    continue
-            x1 = random.randint(RADIUS + 2, max(RADIUS + 2, W - w - RADIUS - 2))
-            y1 = random.randint(RADIUS + 2, max(RADIUS + 2, H - h - RADIUS - 2))
-            x2 = x1 + w
-            y2 = y1 + h
-            if x2 - x1 >= 4 and y2 - y1 >= 4:
-                self.blocks.append({
-                    "x1": float(x1), "y1": float(y1),
-                    "x2": float(x2), "y2": float(y2),
-                    "color": self.block_color
-                })
-
-    def _apply_blocks_from_json(self):
-        """Copy pre-validated JSON blocks (same each reset)."""
-        self.blocks = []
-        if self.blocks_mode != "json" or not self.blocks_json:
-            return
-        # Clone and apply per-block color defaults
-        for b in self.blocks_json:
-            color = b.get("color")
-            if color is None:
-                # Default to auto-contrast color against bg
-                color = self.ui_text_color if not self.windowless else "white"
-            self.blocks.append({
-                "x1": float(b["x1"]), "y1": float(b["y1"]),
-                "x2": float(b["x2"]), "y2": float(b["y2"]),
-                "color": color
-            })
-
+    def _make_sprites(self):
+        """Rasterize each kind's emoji once into a PhotoImage. Returns {kind: PhotoImage}, or None to draw text."""
+        try:
+            from PIL import ImageTk  # type: ignore
+        except Exception:
+            self._log("warning: PIL not available; --sprites ignored, drawing units as text.")
+            return None
+        font = load_emoji_font()
+        if font is None:
+            self._log("warning: no color emoji font found; --sprites ignored, drawing units as text.")
+            return None
+        sprites = {}
+        for kind in self.kinds_order:
+            try:
+                img = rasterize_emoji(self.emoji[kind], font)
+            except Exception as e:
+                self._log(f"warning: failed to rasterize '{self.emoji[kind]}': {e}; drawing units as text.")
+                return None
+            if img is None:
+                self._log(f"warning: emoji font has no glyph for '{self.emoji[kind]}'; drawing units as text.")
+                return None
+            sprites[kind] = ImageTk.PhotoImage(img)
+        return sprites
+
+    def _show_bg_photo(self):
+        """Put the background PhotoImage on the canvas, behind everything else."""
+        self._bg_item = self.canvas.create_image(0, 0, image=self._bg_photo, anchor="nw")
+        self.canvas.lower(self._bg_item)  # send to back
+        self._bg_is_image = True
+
+    # ---------------- Blocks (obstacles) ----------------
     def _draw_blocks(self):
-        """Draw blocks on the canvas (windowed only)."""
+        """Draw blocks on the canvas (windowed only), reusing the last game's rectangles."""
         if self.canvas is None:
             return
-        # Clear existing
-        for cid in self.block_items:
-            try:
-                self.canvas.delete(cid)
-            except Exception:
-                pass
-        self.block_items = []
-
-        for b in self.blocks:
-            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
-            color = b.get("color", self.ui_text_color)
+        shapes = [(b["x1"], b["y1"], b["x2"], b["y2"], b.get("color") or self.ui_text_color)
+                  for b in self.blocks]
+        if shapes == self._block_shapes:
+            return  # same blocks as last game (JSON blocks): leave them as they are
+
+        for i, (x1, y1, x2, y2, color) in enumerate(shapes):
+            if i < len(self.block_items):
+                cid = self.block_items[i]
+                self.canvas.coords(cid, x1, y1, x2, y2)
+                self.canvas.itemconfigure(cid, fill=color, outline=color, state="normal")
+                continue
             cid = self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline=color)
             # Keep blocks above background but below emojis
             self.canvas.tag_lower(cid)  # send low in stack
             if self._bg_item is not None:
                 self.canvas.tag_raise(cid, self._bg_item)
             self.block_items.append(cid)
+        for cid in self.block_items[len(shapes):]:
+            self.canvas.itemconfigure(cid, state="hidden")
+        self._block_shapes = shapes
 
-    def _point_in_any_block(self, x, y, margin=0.0):
-        """Return True if point (x,y) is inside any block expanded by margin."""
-        for b in self.blocks:
-            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
-            if (x1 - margin) <= x <= (x2 + margin) and (y1 - margin) <= y <= (y2 + margin):
-                return True
-        return False
-
-    def _colliding_block(self, x, y, margin=0.0):
-        """Return the first block dict containing point (x,y) with margin, or None."""
-        for b in self.blocks:
-            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
-            if (x1 - margin) <= x <= (x2 + margin) and (y1 - margin) <= y <= (y2 + margin):
-                return b
-        return None
+    def _draw_units(self):
+        """Show this game's units on the canvas (windowed), reusing the last game's items."""
+        if self.canvas is None:
+            return
+        pool = self._unit_items
+        coords = []
+        configs = []
+        for i, u in enumerate(self.units):
+            if i < len(pool):
+                u.item = pool[i]
+                option, value = self._unit_looks[u.kind]
+                coords += (u.item, u.x, u.y)
+                configs += (u.item, "-state", "normal", u.item, option, value)
+                continue
+            if self._sprites is not None:
+                u.item = self.canvas.create_image(u.x, u.y, image=self._sprites[u.kind], anchor="center")
+            else:
+                u.item = self.canvas.create_text(
+                    u.x, u.y, text=self.emoji[u.kind],
+                    font=("Apple Color Emoji", FONT_SIZE),
+                    anchor="center"
+                )
+            pool.append(u.item)
+        for item in pool[len(self.units):]:
+            configs += (item, "-state", "hidden")
+        self.canvas.tk.call(RENDER_PROC, self.canvas._w, tuple(coords), tuple(configs))
 
     # ---------------- Logging helpers ----------------
-    def _log(self, msg):
+    def _log(self, msg, record=None):
+        """
+        Log a line to stdout and the log file. In binary log format the file
+        gets `record` (bytes) instead of the text, or a message record if None.
+        """
         if self.logf is not None:
-            self.logf.write(msg + "\n")
-            self.logf.flush()
+            if self._binary_log:
+                data = record if record is not None else binlog.message_record(msg)
+            else:
+                data = msg + "\n"
+            if data:
+                if self._log_writer is not None:
+                    self._log_writer.write(data)
+                else:
+                    self.logf.write(data)
+                    self.logf.flush()
         if not self.quiet:
             print(msg)
 
+    def close_log(self):
+        """Flush and close the log file (buffered modes also do this at exit)."""
+        if self._log_writer is not None:
+            self._log_writer.close()
+        elif self.logf is not None:
+            self.logf.close()
+        self.logf = None
+        self._log_writer = None
+
+    def _blocks_desc(self):
+        """The --blocks setting as logged: "none", "random(N)" or "json:PATH"."""
+        if self.blocks_mode == "json":
+            return f"json:{self.blocks_json_path}"
+        if self.blocks_mode == "random":
+            return f"random({self.blocks_count})"
+        return self.blocks_mode
+
+    def _header_settings(self, now):
+        """Run settings for the binary log header (and, with the game's seed, recordings)."""
+        settings = {
+            "start": now, "size": [self.width, self.height],
+            "units_per_kind": self.units_per_kind, "total_units": self.num_units,
+            "delay_ms": self.base_delay_ms,
+            "seed": self.current_seed if self.fixed_seed is not None else None,
+            "kinds": list(self.kinds_order),
+            "emoji": [self.emoji.get(k, k) for k in self.kinds_order],
+            "fast_forward": self.ff_enabled, "num_games": self.num_games,
+            "blocks": self._blocks_desc(), "physics": self.physics,
+            "placement": self.placement, "engine": self.engine,
+        }
+        if self.resumed:
+            settings.update(resumed_at=self.resumed_at, resumed_from=self.resume_file)
+        return settings
+
     def _write_log_header(self):
         now = datetime.datetime.now().isoformat(" ")
-        blocks_desc = self.blocks_mode if self.blocks_mode != "json" else f"json:{self.blocks_json_path}"
-        if self.blocks_mode == "random":
-            blocks_desc += f"({self.blocks_count})"
         settings = ("start={0} | size={1}x{2} | units_per_kind={3} | total_units={4} | "
                     "delay_ms={5} | seed={6} | kinds={7} | fast_forward={8} | num_games={9} | blocks={10} | "
                     "file_logging={11} | logfile={12}"
                     .format(now, self.width, self.height,
                             self.units_per_kind, self.num_units,
-                            self.delay_ms,
+                            self.base_delay_ms,
                             self.current_seed if self.fixed_seed is not None else "random",
                             ",".join(self.kinds_order),
                             "on" if self.ff_enabled else "off",
-                            self.num_games, blocks_desc,
+                            self.num_games, self._blocks_desc(),
                             "off" if self.no_log else "on",
                             self.log_filename if not self.no_log else ""))
-        self._log(settings)
+        if self.physics != DEFAULT_PHYSICS:
+            settings += " | physics=" + ",".join(f"{k}:{v}" for k, v in sorted(self.physics.items()))
+        # Settings that change the game, beyond the defaults (so a replay can re-simulate it)
+        if self.placement != "random":
+            settings += f" | placement={self.placement}"
+        if self.engine != "python":
+            settings += f" | engine={self.engine}"
+        # A resumed run's first game starts mid-game: a replay can't re-simulate it from its seed
+        if self.resumed:
+            settings += f" | resumed_at={self.resumed_at} | resumed_from={self.resume_file}"
+        record = None
+        if self._binary_log:
+            record = binlog.header_record(self._header_settings(now))
+        self._log(settings, record)
         header = ["STEP"]
         for k in self.kinds_order:
             header.append(self.emoji.get(k, k))
-        self._log(",".join([str(h) for h in header]))
+        self._log(",".join([str(h) for h in header]), b"")
 
-    def _log_counts_if_needed(self, converted_happened):
+    def _log_counts_if_needed(self, converted_happened, counts=None):
         if not converted_happened:
             return
-        counts = self._counts_by_kind()
-        row = [str(self.step_num)]
-        for k in self.kinds_order:
-            row.append(str(counts.get(k, 0)))
-        self._log(",".join(row))
+        if counts is None:
+            counts = self.sim.kind_counts
+        values = [counts.get(k, 0) for k in self.kinds_order]
+        record = binlog.row_record(self.step_num, values) if self._binary_log else None
+        self._log(",".join([str(self.step_num)] + [str(v) for v in values]), record)
 
     def _log_game_end(self):
         end_ts = datetime.datetime.now().isoformat(" ")
         elapsed = time.time() - self.game_start_time
         msg = "game_end at {0}; elapsed={1:.3f}s; steps={2}".format(end_ts, elapsed, self.step_num)
-        self._log(msg)
+        record = binlog.game_end_record(self.step_num, elapsed, time.time()) if self._binary_log else None
+        self._log(msg, record)
+        if self._phase_times is not None:
+            self._log_phase_report(elapsed)
+        stats = self._sched_stats
+        if stats is not None and (stats["late"] or stats["skipped"]):
+            self._log("scheduler: late_frames={0} max_overrun={1:.1f}ms total_overrun={2:.1f}ms "
+                      "dropped_frames={3} skipped_ticks={4}".format(
+                          stats["late"], stats["max_s"] * 1e3, stats["total_s"] * 1e3,
+                          stats["dropped"], stats["skipped"]))
 
     # ---------------- State & setup ----------------
-    def _counts_by_kind(self):
-        counts = {}
-        for u in self.units:
-            counts[u.kind] = counts.get(u.kind, 0) + 1
-        return counts
-
     def reset(self):
         if not self.windowless and self._restart_after_id is not None and self.root is not None:
             self.root.after_cancel(self._restart_after_id)
@@ -524,100 +1606,70 @@ class RPSArena(object):
             self.root.after_cancel(self._countdown_after_id)
             self._countdown_after_id = None
 
-        if self.canvas is not None:
-            self.canvas.delete("all")
-            # Re-apply background after clearing canvas
-            self._apply_background(self.bg_source)
-
-        # Blocks: regenerate for random mode each reset; reuse JSON blocks as-is
-        if self.blocks_mode == "random":
-            self._generate_blocks_random()
-        elif self.blocks_mode == "json":
-            self._apply_blocks_from_json()
-        else:
-            self.blocks = []
-
-        if self.canvas is not None and self.blocks:
-            self._draw_blocks()
+        # Blocks and units (seeded with this game's seed); canvas items are
+        # kept from the last game and updated in place
+        self.sim.reset(self.current_seed)
+        self._draw_blocks()
+        self._draw_units()
 
-        self.units = []
-        self.step_num = 0
         self.game_start_time = time.time()
         self.ff_active = False
-        self._in_countdown = False
         self.delay_ms = self.base_delay_ms
-        self._countdown_item = None
-        self._stats_item = None
-
-        # Exactly units_per_kind of each kind
-        kinds_list = list(self.kinds_order)
-        kinds = []
-        for k in kinds_list:
-            kinds.extend([k] * self.units_per_kind)
-        random.shuffle(kinds)
-
-        # Place with minimum separation (best-effort) and outside blocks (margin=RADIUS)
-        placed = 0
-        attempts = 0
-        max_attempts = len(kinds) * 500
-        while placed < len(kinds) and attempts < max_attempts:
-            attempts += 1
-            x = random.uniform(RADIUS + 2, self.width - RADIUS - 2)
-            y = random.uniform(RADIUS + 2, self.height - RADIUS - 2)
-
-            if self._point_in_any_block(x, y, margin=RADIUS):
-                continue
-
-            too_close = False
-            for u in self.units:
-                if distance_between(x, y, u.x, u.y) < (MIN_SEP * MIN_SEP):
-                    too_close = True
-                    break
-            if too_close:
-                continue
-
-            kind = kinds[placed]
-            item = None
-            if self.canvas is not None:
-                item = self.canvas.create_text(
-                    x, y, text=self.emoji[kind],
-                    font=("Apple Color Emoji", FONT_SIZE),
-                    anchor="center"
-                )
+        self._start_game()
 
-            angle = random.uniform(0, 2*math.pi)
-            speed = random.uniform(0, BASE_SPEED)
-            vx, vy = math.cos(angle)*speed, math.sin(angle)*speed
-            self.units.append(Emoji(kind, x, y, vx, vy, item))
-            placed += 1
+        fallbacks = self.sim.placement_fallbacks
+        if self.placement == "poisson" and fallbacks:
+            self._log(f"placement: arena full; {fallbacks} of {len(self.units)} units placed ignoring min separation")
 
-        # If we couldn't place all with constraints, place remaining without min-sep but still outside blocks
-        for k in kinds[placed:]:
-            tries = 0
-            while True and tries < 2000:
-                tries += 1
-                x = random.uniform(RADIUS + 2, self.width - RADIUS - 2)
-                y = random.uniform(RADIUS + 2, self.height - RADIUS - 2)
-                if not self._point_in_any_block(x, y, margin=RADIUS):
-                    break
-            item = None
-            if self.canvas is not None:
-                item = self.canvas.create_text(
-                    x, y, text=self.emoji[k],
-                    font=("Apple Color Emoji", FONT_SIZE),
-                    anchor="center"
-                )
-            angle = random.uniform(0, 2*math.pi)
-            speed = random.uniform(0, BASE_SPEED)
-            vx, vy = math.cos(angle)*speed, math.sin(angle)*speed
-            self.units.append(Emoji(k, x, y, vx, vy, item))
+    def _start_game(self):
+        """Per-game timers and outputs, at the start of a game or of a resumed one."""
+        if self.profile_phases:
+            self._phase_times = dict((phase, []) for phase in PHASES)
+        self._game_ticks = 0
+        self._in_countdown = False
+        self._tick_debt = 0.0
+        self._frame_deadline = None
+        self._sched_stats = {"late": 0, "dropped": 0, "skipped": 0, "max_s": 0.0, "total_s": 0.0}
+        if self._recorder is not None:
+            self._start_recording()
+
+    # --- Snapshots (checkpoint and resume) ---
+    def snapshot(self):
+        """
+        The game in progress as bytes (see Simulation.snapshot), plus what the
+        run needs to carry on: games played, seed, fast forward and elapsed time.
+        """
+        extra = {"games_played": self.games_played, "current_seed": self.current_seed,
+                 "ff_active": self.ff_active, "delay_ms": self.delay_ms,
+                 "elapsed": time.time() - self.game_start_time}
+        if self._engine is not None:
+            self._engine.store(self.units)
+            extra["engine_rng"] = self._engine.rng.bit_generator.state
+        return self.sim.snapshot(extra)
+
+    def restore(self, data):
+        """Continue from snapshot() bytes (windowless); the game loop picks up at the saved step."""
+        extra = self.sim.restore(data)
+        self.games_played = extra["games_played"]
+        self.current_seed = extra["current_seed"]
+        self.ff_active = extra["ff_active"]
+        self.delay_ms = extra["delay_ms"]
+        self.game_start_time = time.time() - extra["elapsed"]
+        self._engine_rng_state = extra.get("engine_rng")
+
+    def _write_checkpoint(self):
+        """Replace checkpoint_file with a snapshot, atomically (a kill mid-write keeps the last one)."""
+        tmp = self.checkpoint_file + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.snapshot())
+        os.replace(tmp, self.checkpoint_file)
 
     # --- Stats overlay ---
     def _update_stats_overlay(self):
         if not self.showstats or self.canvas is None:
             return
         elapsed = time.time() - self.game_start_time
-        counts = self._counts_by_kind()
+        counts = self.sim.kind_counts
         parts = [f"{k}:{counts.get(k,0)}" for k in self.kinds_order]
         text = f"t={elapsed:.1f}s step={self.step_num} " + " ".join(parts)
         if self._stats_item is None:
@@ -674,164 +1726,27 @@ class RPSArena(object):
             self._countdown_after_id = None
 
     # --- Behavior/physics ---
-    def _force_closest_choice(self, me):
-        prey_kind = self.beats[me.kind]
-        predator_kind = self.loses_to[me.kind]
-
-        closest_prey = None
-        closest_pred = None
-        best_prey_d2 = float("inf")
-        best_pred_d2 = float("inf")
-
-        for u in self.units:
-            if u is me:
-                continue
-            d2 = distance_between(me.x, me.y, u.x, u.y)
-            if u.kind == prey_kind and d2 < best_prey_d2:
-                best_prey_d2 = d2
-                closest_prey = u
-            elif u.kind == predator_kind and d2 < best_pred_d2:
-                best_pred_d2 = d2
-                closest_pred = u
-
-        fx, fy = 0.0, 0.0
-        if closest_prey is not None and closest_pred is not None:
-            if best_prey_d2 <= best_pred_d2:
-                dx, dy = normalize(closest_prey.x - me.x, closest_prey.y - me.y)
-                fx += dx * ATTRACTION
-                fy += dy * ATTRACTION
-            else:
-                dx, dy = normalize(me.x - closest_pred.x, me.y - closest_pred.y)
-                fx += dx * REPULSION
-                fy += dy * REPULSION
-        elif closest_prey is not None:
-            dx, dy = normalize(closest_prey.x - me.x, closest_prey.y - me.y)
-            fx += dx * ATTRACTION
-            fy += dy * ATTRACTION
-        elif closest_pred is not None:
-            dx, dy = normalize(me.x - closest_pred.x, me.y - closest_pred.y)
-            fx += dx * REPULSION
-            fy += dy * REPULSION
-
-        # mild ally repel within short range
+    def _render_units(self):
+        """Push this tick's positions and conversions to the canvas in one Tcl call (windowed)."""
+        if self.canvas is None:
+            return
+        coords = []
         for u in self.units:
-            if u is me or u.kind != me.kind:
-                continue
-            d2 = distance_between(me.x, me.y, u.x, u.y)
-            if d2 < (MIN_SEP * MIN_SEP):
-                dx, dy = normalize(me.x - u.x, me.y - u.y)
-                denom = max(math.sqrt(d2), 1.0)
-                strength = ALLY_REPEL * (float(MIN_SEP) / denom)
-                fx += dx * strength
-                fy += dy * strength
-
-        fx += random.uniform(-JITTER, JITTER)
-        fy += random.uniform(-JITTER, JITTER)
-        return fx, fy
-
-    def _apply_forces(self, u):
-        fx, fy = self._force_closest_choice(u)
-        u.vx += fx
-        u.vy += fy
-        u.vx, u.vy = cap_speed(u.vx, u.vy, BASE_SPEED)
-
-    def _move(self, u):
-        # Proposed movement
-        nx = u.x + u.vx
-        ny = u.y + u.vy
-
-        # Walls
-        bounced = False
-        if nx < RADIUS:
-            nx = RADIUS + (RADIUS - nx)
-            u.vx = -u.vx * WALL_BOUNCE
-            bounced = True
-        elif nx > self.width - RADIUS:
-            nx = (self.width - RADIUS) - (nx - (self.width - RADIUS))
-            u.vx = -u.vx * WALL_BOUNCE
-            bounced = True
-        if ny < RADIUS:
-            ny = RADIUS + (RADIUS - ny)
-            u.vy = -u.vy * WALL_BOUNCE
-            bounced = True
-        elif ny > self.height - RADIUS:
-            ny = (self.height - RADIUS) - (ny - (self.height - RADIUS))
-            u.vy = -u.vy * WALL_BOUNCE
-            bounced = True
-
-        # Blocks collision — prevent center from entering any expanded rectangle
-        for _ in range(2):
-            b = self._colliding_block(nx, ny, margin=RADIUS)
-            if b is None:
-                break
-            x1, y1, x2, y2 = b["x1"], b["y1"], b["x2"], b["y2"]
-            left = x1 - RADIUS
-            right = x2 + RADIUS
-            top = y1 - RADIUS
-            bottom = y2 + RADIUS
-
-            dx_left = abs(nx - left)
-            dx_right = abs(nx - right)
-            dy_top = abs(ny - top)
-            dy_bottom = abs(ny - bottom)
-
-            m = min(dx_left, dx_right, dy_top, dy_bottom)
-            if m == dx_left:
-                nx = left
-                u.vx = -abs(u.vx) * WALL_BOUNCE
-            elif m == dx_right:
-                nx = right
-                u.vx = abs(u.vx) * WALL_BOUNCE
-            elif m == dy_top:
-                ny = top
-                u.vy = -abs(u.vy) * WALL_BOUNCE
-            else:
-                ny = bottom
-                u.vy = abs(u.vy) * WALL_BOUNCE
-            bounced = True
-
-        if bounced:
-            u.vx += random.uniform(-0.2, 0.2)
-            u.vy += random.uniform(-0.2, 0.2)
-            u.vx, u.vy = cap_speed(u.vx, u.vy, BASE_SPEED)
-
-        u.x, u.y = nx, ny
-        if self.canvas is not None and u.item is not None:
-            self.canvas.coords(u.item, u.x, u.y)
-
-    def _handle_collisions_and_conversions(self):
-        r2 = float((RADIUS * 1.1) ** 2)
-        n = len(self.units)
-        i = 0
-        converted = False
-        while i < n:
-            a = self.units[i]
-            j = i + 1
-            while j < n:
-                b = self.units[j]
-                if a.kind != b.kind and distance_between(a.x, a.y, b.x, b.y) <= r2:
-                    if self.beats[a.kind] == b.kind:
-                        b.kind = a.kind
-                        if self.canvas is not None and b.item is not None:
-                            self.canvas.itemconfigure(b.item, text=self.emoji[b.kind])
-                        converted = True
-                    elif self.beats[b.kind] == a.kind:
-                        a.kind = b.kind
-                        if self.canvas is not None and a.item is not None:
-                            self.canvas.itemconfigure(a.item, text=self.emoji[a.kind])
-                        converted = True
-                j += 1
-            i += 1
-        return converted
+            coords += (u.item, u.x, u.y)
+        configs = []
+        looks = self._unit_looks
+        for u in self.sim.converted_units:
+            configs.append(u.item)
+            configs += looks[u.kind]
+        self.canvas.tk.call(RENDER_PROC, self.canvas._w, tuple(coords), tuple(configs))
 
     # --- Fast forward when only a resolvable matchup remains ---
     def _maybe_fast_forward(self):
         if not self.ff_enabled or self.ff_active:
             return
-        kinds_present = set([u.kind for u in self.units])
-        if len(kinds_present) != 2:
+        if self.sim.kinds_left != 2:
             return
-        a, b = list(kinds_present)
+        a, b = [k for k, n in self.sim.kind_counts.items() if n > 0]
         if (self.beats.get(a) == b) or (self.beats.get(b) == a):
             if self.delay_ms > 1:
                 self.delay_ms = 1
@@ -839,9 +1754,10 @@ class RPSArena(object):
 
     # --- End-of-game handling (windowed) ---
     def _check_end(self):
-        kinds = set([u.kind for u in self.units])
-        if len(kinds) == 1:
+        if self.sim.winner() is not None:
             self._log_game_end()
+            if self._recorder is not None:
+                self._recorder.end_game(self.step_num)
             self.games_played += 1
 
             # If we've reached the requested number of games, close after postgame delay (windowed only)
@@ -863,11 +1779,9 @@ class RPSArena(object):
         if self.fixed_seed is not None:
             # Deterministic sequence S, S+1, S+2, ...
             self.current_seed += 1
-            random.seed(self.current_seed)
         else:
-            # Fresh random seed each game
-            self.current_seed = random.randint(1, 1000000)
-            random.seed(self.current_seed)
+            # Fresh random seed each game, drawn from the finished game's stream
+            self.current_seed = self.sim.rng.randint(1, 1000000)
 
         self.reset()
         self._maybe_start_countdown()
@@ -876,51 +1790,405 @@ class RPSArena(object):
     def step(self):
         # Pause physics while countdown is visible
         if self._in_countdown:
+            self._frame_deadline = None
             self.root.after(self.delay_ms, self.step)
             return
+        if self._restart_after_id is not None:
+            self._frame_deadline = None
+            self.root.after(self._frame_delay_ms(), self.step)
+            return
 
-        if self._restart_after_id is None:
-            self.step_num += 1
-            for u in self.units:
-                self._apply_forces(u)
-            for u in self.units:
-                self._move(u)
-            converted = self._handle_collisions_and_conversions()
+        frame_start = time.perf_counter()
+        frames = self._frames_due(frame_start)
+        ticks, min_ticks = self._ticks_this_frame(frames)
+        if ticks:
+            self._run_frame_ticks(ticks, min_ticks, frame_start)
+            t0 = time.perf_counter()
+            if self._phase_times is None:
+                self._render_frame()
+            else:
+                self._timed("render", self._render_frame)
+            self._render_s = time.perf_counter() - t0
+        # Next frame at its fixed deadline, however long this one took
+        wait_ms = (self._frame_deadline - time.perf_counter()) * 1000.0
+        self.root.after(max(1, int(round(wait_ms))), self.step)
+
+    def _render_frame(self):
+        """Draw the units and the stats overlay (one "render" sample per frame when profiling)."""
+        self._render_units()
+        self._update_stats_overlay()
+
+    def _frame_period_s(self):
+        """Frame period in seconds, unrounded, for the deadline maths."""
+        if self.target_fps > 0:
+            return 1.0 / self.target_fps
+        return self.delay_ms / 1000.0
+
+    def _frame_delay_ms(self):
+        """Frame period as an after() delay: Tk only takes whole milliseconds."""
+        return max(1, int(round(self._frame_period_s() * 1000.0)))
+
+    def _frames_due(self, now):
+        """
+        Frame periods this frame covers (1 when on time), advancing the next
+        deadline. A frame that starts a whole period late makes up the missed
+        frames, up to MAX_CATCHUP_FRAMES; beyond that they are dropped and the
+        schedule restarts from now. Fast forward without --target-fps runs
+        as fast as frames render: no lateness, catch-up or dropped frames.
+        """
+        period = self._frame_period_s()
+        if self.ff_active and self.target_fps <= 0:
+            self._frame_deadline = now + period
+            return 1
+        if self._frame_deadline is None:
+            self._frame_deadline = now
+        late = now - self._frame_deadline
+        frames = 1
+        if late >= period:
+            stats = self._sched_stats
+            stats["late"] += 1
+            stats["total_s"] += late
+            stats["max_s"] = max(stats["max_s"], late)
+            missed = int(late / period)
+            if missed > MAX_CATCHUP_FRAMES:
+                stats["dropped"] += missed - MAX_CATCHUP_FRAMES
+                self._frame_deadline = now + period
+                return 1 + MAX_CATCHUP_FRAMES
+            frames += missed
+        self._frame_deadline += frames * period
+        return frames
+
+    def _ticks_this_frame(self, frames):
+        """(ticks to run, of which must run) before the next render, covering `frames` frame periods."""
+        if self.target_fps <= 0:
+            return self.steps_per_frame * frames, self.steps_per_frame
+        # One tick is due every delay_ms (1 ms under fast forward)
+        self._tick_debt += frames * (1000.0 / self.target_fps) / self.delay_ms
+        ticks = int(self._tick_debt)
+        self._tick_debt -= ticks
+        if not ticks:
+            return 0, 0
+        return max(ticks, self.steps_per_frame), self.steps_per_frame
+
+    def _run_frame_ticks(self, ticks, min_ticks, frame_start):
+        """
+        Run up to `ticks` ticks, stopping at game end. Past the first
+        `min_ticks`, stop once this frame's time (less the last render) is used up.
+        """
+        period = self._frame_period_s()
+        deadline = frame_start + max(period - self._render_s, 0.25 * period)
+        for n in range(ticks):
+            self._tick()
+            if self._phase_times is None:
+                self._maybe_fast_forward()
+                ended = self._check_end()
+            else:
+                self._timed("end_check", self._maybe_fast_forward)
+                ended = self._timed("end_check", self._check_end)
+            if ended:
+                break
+            if n + 1 >= min_ticks and n + 1 < ticks and time.perf_counter() > deadline:
+                # Physics can't keep up: skip the rest rather than fall further behind
+                self._sched_stats["skipped"] += ticks - (n + 1)
+                self._tick_debt = 0.0
+                break
+
+    # --- Tick phases ---
+    def _tick(self):
+        """One simulation tick, then the log row. Returns True on any conversion."""
+        self._game_ticks += 1
+        if self._phase_times is None:
+            converted = self.sim.tick()
             self._log_counts_if_needed(converted)
-            self._maybe_fast_forward()
-            self._check_end()
-            self._update_stats_overlay()
-        self.root.after(self.delay_ms, self.step)
+        else:
+            converted = self.sim.tick(self._timed)
+            self._timed("logging", self._log_counts_if_needed, converted)
+        if self._recorder is not None:
+            self._recorder.add(self.step_num, self.units)
+        return converted
+
+    def _timed(self, phase, fn, *args):
+        """
+        Call fn(*args), adding its duration to this tick's entry for `phase`
+        (a phase's first call in a tick starts the entry).
+        """
+        t0 = time.perf_counter_ns()
+        result = fn(*args)
+        elapsed = time.perf_counter_ns() - t0
+        times = self._phase_times[phase]
+        if len(times) < self._game_ticks:
+            times.append(elapsed)
+        else:
+            times[-1] += elapsed
+        return result
+
+    def _phase_report(self, elapsed):
+        """Summarize this game's phase timers: total, mean and p99 per phase, plus steps per second."""
+        phases = {}
+        for phase in PHASES:
+            times = sorted(self._phase_times[phase])
+            if not times:
+                continue
+            p99 = times[min(len(times) - 1, max(0, int(math.ceil(0.99 * len(times))) - 1))]
+            total = sum(times)
+            phases[phase] = {"total_s": total / 1e9, "mean_us": total / len(times) / 1e3,
+                             "p99_us": p99 / 1e3}
+        return {"seed": self.current_seed, "steps": self.step_num, "elapsed_s": elapsed,
+                "steps_per_s": self.step_num / elapsed if elapsed > 0 else 0.0,
+                "phases": phases}
+
+    def _log_phase_report(self, elapsed):
+        report = self._phase_report(elapsed)
+        self._log("phases: steps={0} elapsed={1:.3f}s steps_per_s={2:.1f}".format(
+            report["steps"], report["elapsed_s"], report["steps_per_s"]))
+        for phase, t in report["phases"].items():
+            self._log("phase {0}: total={1:.3f}s mean={2:.1f}us p99={3:.1f}us".format(
+                phase, t["total_s"], t["mean_us"], t["p99_us"]))
+        self._write_profile_json(report)
+
+    def _write_profile_json(self, report):
+        if self.profile_json is not None:
+            with open(self.profile_json, "a") as f:
+                f.write(json.dumps(report) + "\n")
 
     # --- Windowless runner (headless loop) ---
-    def run_windowless(self):
+    def _run_game_numpy(self):
+        """Play the current game to the end on the NumPy engine."""
+        engine = self._engine_cls(self.width, self.height, self.kinds_order, self.beats,
+                                  self.current_seed, physics=self.physics)
+        engine.load(self.units, self.blocks)
+        if self._engine_rng_state is not None:  # resumed mid-game
+            engine.rng.bit_generator.state = self._engine_rng_state
+            self._engine_rng_state = None
+        self._engine = engine
         while True:
-            self.step_num = 0
-            self.game_start_time = time.time()
-            self.ff_active = False
-            while True:
-                self.step_num += 1
-                for u in self.units:
-                    self._apply_forces(u)
-                for u in self.units:
-                    self._move(u)
-                converted = self._handle_collisions_and_conversions()
-                self._log_counts_if_needed(converted)
+            self.step_num += 1
+            self._game_ticks += 1
+            if self._phase_times is None:
+                converted = engine.tick()
+            else:
+                converted = engine.tick(self._timed)
+            video_frame = self._video is not None and self.step_num % self.video_every == 0
+            if video_frame or self._recorder is not None:
+                engine.store(self.units)
+                if self._recorder is not None:
+                    self._recorder.add(self.step_num, self.units)
+                if video_frame:
+                    self._video_frame()
+            if self._phase_times is None:
+                counts = self._log_numpy_counts(engine, converted)
+                ended = self._numpy_game_over(counts)
+            else:
+                counts = self._timed("logging", self._log_numpy_counts, engine, converted)
+                ended = self._timed("end_check", self._numpy_game_over, counts)
+            if ended:
+                break
+            if self.checkpoint_every and self.step_num % self.checkpoint_every == 0:
+                self._write_checkpoint()
+        self._engine = None
+        engine.store(self.units)
+        self.sim.recount()
+
+    def _log_numpy_counts(self, engine, converted):
+        """Log row after a NumPy tick. Returns the kind counts, or None if nothing converted."""
+        if not converted:
+            return None
+        counts = dict(zip(self.kinds_order, engine.counts().tolist()))
+        self._log_counts_if_needed(converted, counts)
+        return counts
+
+    def _numpy_game_over(self, counts):
+        """True if the counts from _log_numpy_counts() leave a single kind."""
+        return counts is not None and sum(1 for c in counts.values() if c > 0) == 1
+
+    def _run_game_python(self):
+        """Play the current game to the end on the Python engine."""
+        while True:
+            self._tick()
+            if self._video is not None and self.step_num % self.video_every == 0:
+                self._video_frame()
+            if self._phase_times is None:
                 self._maybe_fast_forward()
-                kinds = set([u.kind for u in self.units])
-                if len(kinds) == 1:
-                    self._log_game_end()
-                    self.games_played += 1
+                if self.sim.winner() is not None:
+                    break
+            else:
+                self._timed("end_check", self._maybe_fast_forward)
+                if self._timed("end_check", self.sim.winner) is not None:
                     break
+            if self.checkpoint_every and self.step_num % self.checkpoint_every == 0:
+                self._write_checkpoint()
+
+    def run_windowless(self):
+        """Play games from the current state (reset, or restored) until num_games are done."""
+        while True:
+            if self.video is not None:
+                self._start_video()
+            if self._engine_cls is not None:
+                self._run_game_numpy()
+            else:
+                self._run_game_python()
+            self._log_game_end()
+            if self._recorder is not None:
+                self._recorder.end_game(self.step_num)
+            if self._video is not None:
+                self._finish_video()
+            self.games_played += 1
             if self.num_games > 0 and self.games_played >= self.num_games:
                 break
             if self.fixed_seed is not None:
                 self.current_seed += 1
-                random.seed(self.current_seed)
             else:
-                self.current_seed = random.randint(1, 1000000)
-                random.seed(self.current_seed)
+                self.current_seed = self.sim.rng.randint(1, 1000000)
             self.reset()
+        if self.checkpoint_every and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)  # the run is complete: nothing left to resume
+
+    # --- Video export (windowless) ---
+    def _start_video(self):
+        """Open this game's video file and draw its first frame."""
+        from . import video as video_export
+        if self._video_renderer is None:
+            self._video_renderer = self._make_video_renderer()
+        self._video_renderer.begin_game(self.blocks)
+        path = self.video.replace("{seed}", str(self.current_seed))
+        self._video = video_export.VideoWriter(path, (self.width, self.height), self.video_fps)
+        self._video_frame()
+
+    def _make_video_renderer(self):
+        """The run's FrameRenderer (its font and background warnings are logged once per run)."""
+        from . import video as video_export
+        return video_export.FrameRenderer(self.width, self.height, self.kinds_order,
+                                          self.emoji, self.bg_source, log=self._log)
+
+    def _video_frame(self):
+        self._video.add(self._video_renderer.render(self.units))
+
+    def _finish_video(self):
+        """Add the final frame, wait for the encoder and log what was written."""
+        if self.step_num % self.video_every:
+            self._video_frame()
+        self._video.close()
+        self._log(f"video: {self._video.frames} frames -> {self._video.path}")
+        self._video = None
+
+    # --- Trajectory recording ---
+    def _open_record_file(self):
+        return open(self.record, "ab")
+
+    def _start_recording(self):
+        """Write this game's settings (the log header's, plus its seed and blocks) and tick 0."""
+        settings = self._header_settings(datetime.datetime.now().isoformat(" "))
+        settings.update(seed=self.current_seed, block_rects=self.blocks)
+        self._recorder.begin_game(settings, self.units, self.width, self.height, step=self.step_num)
+
+    def close_record(self):
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
+    # --- Windowless runner (process pool) ---
+    def _worker_settings(self):
+        """Constructor arguments for a worker arena that plays one game like this one."""
+        return dict(width=self.width, height=self.height,
+                    units_per_kind=self.units_per_kind, delay_ms=self.base_delay_ms,
+                    emoji=self.emoji, beats=self.beats, loses_to=self.loses_to,
+                    ff_enabled=self.ff_enabled, blocks=self.blocks_option,
+                    spatial_grid=self.spatial_grid, engine=self.engine,
+                    placement=self.placement, physics=self.physics,
+                    log_format=self.log_format, profile_phases=self.profile_phases,
+                    video=self.video, video_every=self.video_every, video_fps=self.video_fps,
+                    record=self.record, record_compression=self.record_compression,
+                    record_keyframe_every=self.record_keyframe_every)
+
+    def run_windowless_parallel(self):
+        """
+        Play windowless games across a process pool. Game k uses the seed a
+        serial run would give it (seed+k with --seed; without one, seeds are
+        drawn up front instead of chained through each game's draws). Each
+        game's log block is written in seed order, so the log matches a serial
+        run apart from timestamps.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        settings = self._worker_settings()
+        if self.video is not None:
+            # Log the renderer's warnings here, once, rather than once per worker game
+            self._video_renderer = self._make_video_renderer()
+        seed = self.current_seed
+        rng = random.Random(seed)
+        submitted = 0
+        pending = collections.deque()
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            while True:
+                while len(pending) < self.jobs * 2 and (self.num_games == 0 or submitted < self.num_games):
+                    pending.append((seed, pool.submit(_play_windowless_game, settings, seed)))
+                    submitted += 1
+                    if self.fixed_seed is not None:
+                        seed += 1
+                    else:
+                        seed = rng.randint(1, 1000000)
+                if not pending:
+                    break
+                self.current_seed, future = pending.popleft()
+                lines, reports, recording = future.result()
+                for line, record in lines:
+                    self._log(line, record)
+                for report in reports:
+                    self._write_profile_json(report)
+                if recording:
+                    self._recorder.f.write(recording)
+                    self._recorder.f.flush()
+                self.games_played += 1
+
+class _WorkerArena(RPSArena):
+    """
+    Windowless arena that collects its log lines instead of writing them.
+    Lines from game_lines_from on belong to the game; those before it (the
+    header and setup warnings) are the parent's to log, once per run.
+    """
+    def __init__(self, *args, **kwargs):
+        self.lines = []
+        self.setup_lines = []
+        self.game_lines_from = 0
+        self.profile_reports = []
+        RPSArena.__init__(self, *args, **kwargs)
+
+    def _log(self, msg, record=None):
+        self.lines.append((msg, record))
+
+    def reset(self):
+        self.game_lines_from = len(self.lines)
+        RPSArena.reset(self)
+
+    def _make_video_renderer(self):
+        from . import video as video_export
+        return video_export.FrameRenderer(self.width, self.height, self.kinds_order,
+                                          self.emoji, self.bg_source, log=self.setup_lines.append)
+
+    def _write_profile_json(self, report):
+        self.profile_reports.append(report)
+
+    def _open_record_file(self):
+        return io.BytesIO()  # handed back to the parent, which appends it in seed order
+
+def play_windowless_game(settings, seed):
+    """
+    Play one windowless game with seed `seed` and RPSArena keyword arguments
+    `settings`, printing and writing nothing. Returns the finished arena; its
+    log entries are in arena.lines.
+    """
+    return _WorkerArena(None, windowless=True, quiet=True, no_log=True,
+                        fixed_seed=seed, num_games=1, **settings)
+
+def _play_windowless_game(settings, seed):
+    """
+    Process-pool worker: play one seeded game. Returns the (line, record) log
+    entries of the game itself (not the header or setup warnings), its phase
+    reports if profiling, and its recording bytes (b"" without --record).
+    """
+    arena = play_windowless_game(settings, seed)
+    recording = arena._recorder.f.getvalue() if arena._recorder is not None else b""
+    return arena.lines[arena.game_lines_from:], arena.profile_reports, recording
 
 # ---------------- Utility ----------------
 def unicode_safe(x):
@@ -930,8 +2198,18 @@ def unicode_safe(x):
         return x
 
 # ---------------- CLI / Main ----------------
-def parse_args():
-    p = argparse.ArgumentParser(description="RPS Arena")
+# Subcommands: `rpsarena NAME ...` runs the main(argv) of the named submodule
+SUBCOMMANDS = {
+    "bench": "benchmarks",
+    "fork": "fork",
+    "replay": "replay",
+    "sweep": "sweep",
+}
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="RPS Arena",
+                                epilog="Subcommands: " + ", ".join(sorted(SUBCOMMANDS)) +
+                                       " (run 'rpsarena NAME -h' for details).")
     p.add_argument("-s","--size", type=int, nargs=2, metavar=("WIDTH","HEIGHT"),
                    help=f"Window size as WIDTH HEIGHT (default {DEFAULT_WIDTH} {DEFAULT_HEIGHT})")
     p.add_argument("-u","--units", type=int, default=DEFAULT_UNITS_PER_KIND,
@@ -960,10 +2238,61 @@ def parse_args():
                    help="Disable logging to file (stdout still used unless --quiet).")
     p.add_argument("--logfile", type=str, default=DEFAULT_LOGFILE,
                    help=f"Log file name (default {DEFAULT_LOGFILE})")
-    return p.parse_args()
-
-def main():
-    args = parse_args()
+    p.add_argument("--log-format", choices=("text", "binary"), default=DEFAULT_LOG_FORMAT,
+                   help="Log file format: text (default) or compact binary records (read with rpsarena.binlog).")
+    p.add_argument("--log-flush", choices=("line", "interval", "end"), default=DEFAULT_LOG_FLUSH,
+                   help="When to flush the log file: every line (default), every --log-flush-interval "
+                        "seconds from a background writer, or only at exit.")
+    p.add_argument("--log-flush-interval", type=float, default=DEFAULT_LOG_FLUSH_INTERVAL,
+                   help=f"Seconds between flushes with --log-flush interval (default {DEFAULT_LOG_FLUSH_INTERVAL})")
+    p.add_argument("--profile-phases", action="store_true",
+                   help="Time each tick phase and log total/mean/p99 per phase and steps per second at game end.")
+    p.add_argument("--profile-json", type=str, default=None, metavar="FILE",
+                   help="Also append each game's phase report to FILE as a JSON line (implies --profile-phases).")
+    p.add_argument("--steps-per-frame", type=int, default=1, metavar="K",
+                   help="Physics ticks per rendered frame (windowed; default 1).")
+    p.add_argument("--target-fps", type=float, default=0, metavar="FPS",
+                   help="Render at FPS frames per second and run the ticks due at one per delay in between, "
+                        "skipping ticks that don't fit (windowed; default off).")
+    p.add_argument("--sprites", action="store_true",
+                   help="Draw units as emoji images rasterized once with PIL (windowed; falls back to text).")
+    p.add_argument("--grid", action="store_true",
+                   help="Use a uniform spatial grid for neighbor queries (faster with many units; same results).")
+    p.add_argument("--placement", choices=("random", "poisson"), default="random",
+                   help="Initial placement: random rejection sampling, or grid-accelerated Poisson-disk sampling.")
+    p.add_argument("-j","--jobs", type=int, default=1,
+                   help="Play windowless games in N worker processes; the log matches a serial run (default 1).")
+    p.add_argument("--video", type=str, default=None, metavar="FILE",
+                   help="Render windowless games offscreen to FILE: .png (frame sequence), .gif, or any "
+                        "ffmpeg format such as .mp4. '{seed}' in FILE is replaced by each game's seed.")
+    p.add_argument("--video-every", type=int, default=1, metavar="N",
+                   help="Render every Nth tick to --video (default 1).")
+    p.add_argument("--video-fps", type=float, default=DEFAULT_VIDEO_FPS, metavar="FPS",
+                   help=f"Playback frame rate of --video output (default {DEFAULT_VIDEO_FPS}).")
+    p.add_argument("--record", type=str, default=None, metavar="FILE",
+                   help="Append each game's per-tick unit positions and kinds to FILE (read with rpsarena.record).")
+    p.add_argument("--record-compression", choices=("zlib", "lzma"), default="zlib",
+                   help="Compression for --record blocks (default zlib; lzma is smaller and slower).")
+    p.add_argument("--record-keyframe-every", type=int, default=DEFAULT_KEYFRAME_EVERY, metavar="N",
+                   help=f"Ticks per --record block, each starting with a full keyframe (default {DEFAULT_KEYFRAME_EVERY}).")
+    p.add_argument("--checkpoint-every", type=int, default=0, metavar="N",
+                   help="Save the game in progress every N ticks, to resume with --resume (serial windowless runs).")
+    p.add_argument("--checkpoint", type=str, default=DEFAULT_CHECKPOINT_FILE, metavar="FILE",
+                   help=f"Checkpoint file for --checkpoint-every (default {DEFAULT_CHECKPOINT_FILE}).")
+    p.add_argument("--resume", type=str, default=None, metavar="FILE",
+                   help="Continue a windowless run from a checkpoint file; pass the run's other options again.")
+    p.add_argument("--engine", choices=("python", "numpy"), default="python",
+                   help="Simulation engine for windowless runs; numpy falls back to python if NumPy is missing.")
+    return p.parse_args(argv)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in SUBCOMMANDS:
+        import importlib
+        module = importlib.import_module("." + SUBCOMMANDS[argv[0]], __name__)
+        return module.main(argv[1:])
+
+    args = parse_args(argv)
     if args.windowless and args.num_games == 0:
         args.num_games = 1
     if args.size is not None:
@@ -984,17 +2313,30 @@ def main():
         root.resizable(False, False)
         root.title("RPS Arena")
 
-    RPSArena(root, width, height, args.units, delay_ms,
-             emoji=DEFAULT_EMOJI, beats=DEFAULT_BEATS, loses_to=DEFAULT_LOSES_TO,
-             fixed_seed=args.seed, num_games=args.num_games,
-             log_filename=args.logfile, no_log=args.no_log,
-             ff_enabled=(not args.no_ff),
-             background_color=args.bg, countdown_s=args.countdown,
-             windowless=args.windowless, quiet=args.quiet,
-             showstats=args.showstats, blocks=args.blocks)
+    arena = RPSArena(root, width, height, args.units, delay_ms,
+                     emoji=DEFAULT_EMOJI, beats=DEFAULT_BEATS, loses_to=DEFAULT_LOSES_TO,
+                     fixed_seed=args.seed, num_games=args.num_games,
+                     log_filename=args.logfile, no_log=args.no_log,
+                     ff_enabled=(not args.no_ff),
+                     background_color=args.bg, countdown_s=args.countdown,
+                     windowless=args.windowless, quiet=args.quiet,
+                     showstats=args.showstats, blocks=args.blocks,
+                     spatial_grid=args.grid, engine=args.engine, placement=args.placement,
+                     jobs=args.jobs, log_flush=args.log_flush,
+                     log_flush_interval=args.log_flush_interval, log_format=args.log_format,
+                     profile_phases=args.profile_phases, profile_json=args.profile_json,
+                     sprites=args.sprites, steps_per_frame=args.steps_per_frame,
+                     target_fps=args.target_fps, video=args.video,
+                     video_every=args.video_every, video_fps=args.video_fps,
+                     record=args.record, record_compression=args.record_compression,
+                     record_keyframe_every=args.record_keyframe_every,
+                     checkpoint_every=args.checkpoint_every, checkpoint_file=args.checkpoint,
+                     resume=args.resume)
 
     if not args.windowless:
         root.mainloop()
+    arena.close_log()
+    arena.close_record()
 
 if __name__=="__main__":
     main()
@@ -0,0 +1,233 @@
+"""
+Benchmark suite: `rpsarena bench [SCENARIO ...]`
+
+Times the canonical scenarios (see scenarios.py) at growing unit counts,
+per tick phase (forces, move, collisions), fits the empirical scaling
+exponent of each (time per tick ~ c * n^k, least squares in log-log
+space) and writes the results as JSON.
+
+Each measurement sets up a seeded game (placement isn't timed), runs a
+warm-up tick, then ticks for about --seconds, starting a new game if one
+ends. A size whose ticks would take longer than --max-tick-seconds,
+extrapolated from the curve measured so far, is skipped along with the
+larger ones, so the brute-force scenarios stop long before 100,000 units
+while the NumPy engine goes all the way.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import platform
+import sys
+import time
+
+from .. import Simulation
+from .scenarios import DEFAULT_SIZES, SCENARIOS, arena_size, block_layout
+
+BENCH_PHASES = ("forces", "move", "collisions")
+WARMUP_TICKS = 1
+MIN_TICKS = 3
+DEFAULT_SECONDS = 1.0
+DEFAULT_MAX_TICK_SECONDS = 1.0
+
+
+class _PhaseTimer(object):
+    """The `timed(phase, fn, *args)` hook of Simulation.tick and NumpyEngine.tick: sums ns per phase."""
+    def __init__(self):
+        self.ns = dict((phase, 0) for phase in BENCH_PHASES)
+
+    def __call__(self, phase, fn, *args):
+        t0 = time.perf_counter_ns()
+        result = fn(*args)
+        self.ns[phase] += time.perf_counter_ns() - t0
+        return result
+
+
+def _setup(spec, n, seed):
+    """A seeded game for scenario `spec` with about n units. Returns (sim, NumpyEngine or None)."""
+    width, height = arena_size(n, spec["area_per_unit"])
+    per_side = spec.get("blocks_per_side", 0)
+    blocks = block_layout(width, height, per_side) if per_side else 0
+    sim = Simulation(width, height, max(1, n // 3), blocks=blocks,
+                     spatial_grid=spec.get("grid", False), placement="poisson")
+    sim.reset(seed)
+    if spec.get("engine", "python") == "numpy":
+        from ..engine_numpy import NumpyEngine
+        engine = NumpyEngine(width, height, sim.kinds_order, sim.beats, seed, physics=sim.physics)
+        engine.load(sim.units, sim.blocks)
+        return sim, engine
+    return sim, None
+
+
+def _restart(sim, engine, seed):
+    """Start a new game with `seed` on the same arena (and engine, re-seeded)."""
+    sim.reset(seed)
+    if engine is not None:
+        import numpy as np  # type: ignore
+        engine.rng = np.random.default_rng(seed)
+        engine.load(sim.units, sim.blocks)
+
+
+def _ended(sim, engine, converted):
+    """True once a single kind is left (the NumPy engine is only checked after a conversion)."""
+    if engine is None:
+        return sim.winner() is not None
+    return bool(converted) and int((engine.counts() > 0).sum()) == 1
+
+
+def measure(spec, n, seconds=DEFAULT_SECONDS, seed=1):
+    """Tick one scenario at about n units for ~`seconds`; returns ticks per second overall and per phase."""
+    sim, engine = _setup(spec, n, seed)
+    tick = sim.tick if engine is None else engine.tick
+    for _ in range(WARMUP_TICKS):
+        tick()
+    timer = _PhaseTimer()
+    ticks = 0
+    total_ns = 0
+    games = 1
+    deadline = time.perf_counter() + seconds
+    while ticks < MIN_TICKS or time.perf_counter() < deadline:
+        t0 = time.perf_counter_ns()
+        converted = tick(timer)
+        total_ns += time.perf_counter_ns() - t0
+        ticks += 1
+        if _ended(sim, engine, converted):
+            seed += 1
+            games += 1
+            _restart(sim, engine, seed)
+    total_s = total_ns / 1e9
+    phases = {}
+    for phase in BENCH_PHASES:
+        phase_s = timer.ns[phase] / 1e9
+        phases[phase] = {"us_per_tick": phase_s / ticks * 1e6,
+                         "ticks_per_s": ticks / phase_s if phase_s > 0 else None}
+    return {"n": len(sim.units), "width": sim.width, "height": sim.height, "blocks": len(sim.blocks),
+            "ticks": ticks, "games": games, "seconds": total_s,
+            "ticks_per_s": ticks / total_s if total_s > 0 else None,
+            "us_per_tick": total_s / ticks * 1e6, "phases": phases}
+
+
+def fit_exponent(points):
+    """
+    Least-squares fit of t = c * n^k to [(n, t)] in log-log space. Returns
+    {"exponent": k, "coefficient": c, "r2": ...}, or None with fewer than
+    two usable points.
+    """
+    pts = [(math.log(n), math.log(t)) for n, t in points if n > 0 and t and t > 0]
+    if len(set(x for x, _ in pts)) < 2:
+        return None
+    mx = sum(x for x, _ in pts) / len(pts)
+    my = sum(y for _, y in pts) / len(pts)
+    sxx = sum((x - mx) ** 2 for x, _ in pts)
+    sxy = sum((x - mx) * (y - my) for x, y in pts)
+    k = sxy / sxx
+    b = my - k * mx
+    ss_tot = sum((y - my) ** 2 for _, y in pts)
+    ss_res = sum((y - (b + k * x)) ** 2 for x, y in pts)
+    return {"exponent": k, "coefficient": math.exp(b),
+            "r2": 1.0 - ss_res / ss_tot if ss_tot > 0 else 1.0}
+
+
+def _fits(sizes):
+    fits = {"total": fit_exponent([(r["n"], r["us_per_tick"]) for r in sizes])}
+    for phase in BENCH_PHASES:
+        fits[phase] = fit_exponent([(r["n"], r["phases"][phase]["us_per_tick"]) for r in sizes])
+    return fits
+
+
+def run_scenario(name, sizes=DEFAULT_SIZES, seconds=DEFAULT_SECONDS,
+                 max_tick_seconds=DEFAULT_MAX_TICK_SECONDS, seed=1, log=print):
+    """Measure scenario `name` at each size (ascending) and fit its scaling curves."""
+    spec = dict(SCENARIOS[name])
+    if spec.get("engine") == "numpy":
+        try:
+            import numpy  # type: ignore  # noqa: F401
+        except ImportError:
+            log(f"warning: NumPy not available; scenario '{name}' runs on the python engine with the grid.")
+            spec.update(engine="python", grid=True)
+    results = []
+    skipped = []
+    for n in sorted(sizes):
+        if results:
+            last = results[-1]
+            fit = _fits(results)["total"] if len(results) >= 2 else None
+            k = max(1.0, fit["exponent"]) if fit is not None else 2.0
+            predicted = last["us_per_tick"] / 1e6 * (n / float(last["n"])) ** k
+            if predicted > max_tick_seconds:
+                skipped = [m for m in sorted(sizes) if m >= n]
+                log(f"{name:<10} n>={n}: skipped (about {predicted:.1f}s per tick predicted)")
+                break
+        r = measure(spec, n, seconds=seconds, seed=seed)
+        results.append(r)
+        phases = " ".join(f"{p}={r['phases'][p]['us_per_tick']:.0f}us" for p in BENCH_PHASES)
+        log(f"{name:<10} n={r['n']:<7} {r['ticks_per_s']:10.1f} ticks/s  {phases}")
+    fits = _fits(results)
+    if fits["total"] is not None:
+        parts = ", ".join(f"{p} n^{fits[p]['exponent']:.2f}" for p in BENCH_PHASES if fits[p] is not None)
+        log(f"{name:<10} fit: time per tick ~ n^{fits['total']['exponent']:.2f} ({parts})")
+    return {"scenario": name, "description": spec["description"],
+            "engine": spec.get("engine", "python"), "grid": bool(spec.get("grid", False)),
+            "area_per_unit": spec["area_per_unit"], "sizes": results, "skipped_sizes": skipped,
+            "fit": fits}
+
+
+def _environment():
+    try:
+        import numpy  # type: ignore
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "machine": platform.machine(), "numpy": numpy_version}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="rpsarena bench",
+                                description="Time the canonical scenarios at growing unit counts, fit their "
+                                            "scaling exponents and write JSON.")
+    p.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                   help=f"Scenarios to run (default: all). One of: {', '.join(SCENARIOS)}.")
+    p.add_argument("--list", action="store_true", help="List the scenarios and exit.")
+    p.add_argument("--sizes", type=str, default=",".join(str(n) for n in DEFAULT_SIZES),
+                   help="Comma-separated unit counts (default %(default)s).")
+    p.add_argument("--seconds", type=float, default=DEFAULT_SECONDS,
+                   help=f"Ticking time per size, after one warm-up tick (default {DEFAULT_SECONDS}).")
+    p.add_argument("--max-tick-seconds", type=float, default=DEFAULT_MAX_TICK_SECONDS,
+                   help="Skip sizes whose ticks are predicted to take longer than this "
+                        f"(default {DEFAULT_MAX_TICK_SECONDS}).")
+    p.add_argument("--seed", type=int, default=1, help="Seed of each measured game (default 1).")
+    p.add_argument("-o", "--out", type=str, default="bench_results.json",
+                   help="JSON results file (default bench_results.json); '-' for stdout.")
+    args = p.parse_args(argv)
+
+    if args.list:
+        for name, spec in SCENARIOS.items():
+            print(f"{name:<10} {spec['description']}")
+        return
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            p.error(f"Unknown scenario '{name}'. Expected one of: {', '.join(SCENARIOS)}")
+    try:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        p.error(f"--sizes expects comma-separated integers, got '{args.sizes}'")
+    if not sizes or min(sizes) < 3:
+        p.error("--sizes needs unit counts of at least 3.")
+
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.out == "-" else print
+    results = {"created": datetime.datetime.now().isoformat(" "),
+               "environment": _environment(),
+               "settings": {"sizes": sizes, "seconds": args.seconds,
+                            "max_tick_seconds": args.max_tick_seconds, "seed": args.seed},
+               "scenarios": [run_scenario(name, sizes, seconds=args.seconds,
+                                          max_tick_seconds=args.max_tick_seconds, seed=args.seed, log=log)
+                             for name in names]}
+    if args.out == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results -> {args.out}")
@@ -0,0 +1,57 @@
+"""
+Canonical benchmark scenarios.
+
+Each scenario keeps the arena's density fixed as the unit count n grows
+(the arena is a square of n * area_per_unit px^2), so a scaling curve
+measures the algorithms rather than a crowd that gets denser with n.
+"""
+
+import math
+
+DEFAULT_SIZES = (30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+
+SCENARIOS = {
+    "sparse": {
+        "description": "few contacts: 20000 px^2 per unit, brute-force neighbour scans",
+        "area_per_unit": 20000,
+    },
+    "dense": {
+        "description": "crowded: 2500 px^2 per unit, brute-force neighbour scans",
+        "area_per_unit": 2500,
+    },
+    "dense-grid": {
+        "description": "as dense, with the uniform spatial grid (--grid)",
+        "area_per_unit": 2500, "grid": True,
+    },
+    "blocks": {
+        "description": "5000 px^2 per unit among 8x8 fixed blocks (as from a --blocks JSON file), with the grid",
+        "area_per_unit": 5000, "blocks_per_side": 8, "grid": True,
+    },
+    "huge": {
+        "description": "5000 px^2 per unit on the NumPy engine, up to 100,000 units",
+        "area_per_unit": 5000, "engine": "numpy",
+    },
+}
+
+
+def arena_size(n, area_per_unit):
+    """Width and height of the square arena for n units."""
+    side = max(200, int(round(math.sqrt(n * area_per_unit))))
+    return side, side
+
+
+def block_layout(width, height, per_side):
+    """
+    A per_side x per_side layout of blocks, one centered in each cell and
+    covering 30% of its width and height, in load_blocks_json()'s form.
+    """
+    cw, ch = width / float(per_side), height / float(per_side)
+    blocks = []
+    for row in range(per_side):
+        for col in range(per_side):
+            x1 = col * cw + 0.35 * cw
+            y1 = row * ch + 0.35 * ch
+            blocks.append({"x1": float(int(x1)), "y1": float(int(y1)),
+                           "x2": float(int(x1 + 0.3 * cw)), "y2": float(int(y1 + 0.3 * ch)),
+                           "color": None})
+    return blocks
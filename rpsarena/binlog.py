@@ -0,0 +1,116 @@
+"""
+Compact binary log format (--log-format binary) and its reader.
+
+A log file is a stream of little-endian records, each starting with a
+one-byte tag. Runs append to the same file, so a file may hold several
+headers.
+
+    H  u32 length, UTF-8 JSON settings (includes "kinds", the column order)
+    M  u32 length, UTF-8 free-form message (warnings and the like)
+    R  i64 step, then one i32 count per kind          (fixed width per header)
+    E  i64 steps, f64 elapsed seconds, f64 end time  (one per game)
+
+read_binary_log() memory-maps a file and returns the conversion rows of
+each game as NumPy arrays that view the mapping directly.
+"""
+
+import collections
+import json
+import struct
+
+FORMAT_VERSION = 1
+
+_LEN = struct.Struct("<I")
+_END = struct.Struct("<qdd")
+
+GameLog = collections.namedtuple("GameLog", "settings steps counts end_step elapsed end_time")
+GameLog.__doc__ = """
+One game from a binary log. `steps` (n,) and `counts` (n, kinds) are the
+conversion rows; `end_step`, `elapsed` and `end_time` are None if the game
+has no footer (the run was killed).
+"""
+
+
+def header_record(settings):
+    data = json.dumps(dict(settings, format=FORMAT_VERSION), sort_keys=True).encode("utf-8")
+    return b"H" + _LEN.pack(len(data)) + data
+
+
+def message_record(text):
+    data = text.encode("utf-8")
+    return b"M" + _LEN.pack(len(data)) + data
+
+
+def row_record(step, counts):
+    return b"R" + struct.pack(f"<q{len(counts)}i", step, *counts)
+
+
+def game_end_record(steps, elapsed, end_time):
+    return b"E" + _END.pack(steps, elapsed, end_time)
+
+
+def read_binary_log(path):
+    """Memory-map a binary log and return a list of GameLog, in file order."""
+    import mmap
+    import numpy as np
+
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return []
+    data = np.frombuffer(mm, dtype=np.uint8)
+    n = len(data)
+
+    games = []
+    settings = None
+    row_dtype = None
+    blocks = []
+
+    def finish(end_step=None, elapsed=None, end_time=None):
+        if len(blocks) == 1:
+            rows = blocks[0]
+        elif blocks:
+            rows = np.concatenate(blocks)
+        else:
+            rows = np.zeros(0, dtype=row_dtype)
+        games.append(GameLog(settings, rows["step"], rows["counts"], end_step, elapsed, end_time))
+        del blocks[:]
+
+    pos = 0
+    while pos < n:
+        tag = data[pos]
+        if tag == ord("H") or tag == ord("M"):
+            (length,) = _LEN.unpack_from(mm, pos + 1)
+            body = bytes(mm[pos + 5:pos + 5 + length])
+            pos += 5 + length
+            if tag == ord("H"):
+                if blocks:
+                    finish()
+                settings = json.loads(body.decode("utf-8"))
+                k = len(settings["kinds"])
+                row_dtype = np.dtype([("tag", "u1"), ("step", "<i8"), ("counts", "<i4", (k,))])
+        elif tag == ord("R"):
+            if row_dtype is None:
+                raise ValueError(f"Invalid binary log: row before header at offset {pos}")
+            width = row_dtype.itemsize
+            # Consecutive rows: find the first stride position that isn't a row tag
+            tags = data[pos:n:width]
+            other = np.flatnonzero(tags != ord("R"))
+            count = int(other[0]) if len(other) else len(tags)
+            count = min(count, (n - pos) // width)
+            if count == 0:
+                break  # truncated trailing record
+            blocks.append(np.frombuffer(mm, dtype=row_dtype, count=count, offset=pos))
+            pos += count * width
+        elif tag == ord("E"):
+            if pos + 1 + _END.size > n:
+                break
+            end_step, elapsed, end_time = _END.unpack_from(mm, pos + 1)
+            pos += 1 + _END.size
+            finish(end_step, elapsed, end_time)
+        else:
+            raise ValueError(f"Invalid binary log: unknown record tag {tag!r} at offset {pos}")
+    if blocks:
+        finish()
+    return games
@@ -0,0 +1,410 @@
+"""
+NumPy structure-of-arrays engine for windowless runs.
+
+Positions, velocities and kinds live in flat arrays and each tick is a
+handful of array operations:
+
+- Forces: units are bucketed into a uniform grid (cells of at least MIN_SEP,
+  sized for a few units per cell); nearest
+  prey/predator and ally repulsion are looked up in the 3x3 neighborhood.
+  Units whose nearest target may lie outside that neighborhood search a
+  grid of the target kind's units ring by ring until the best distance is
+  bounded. Small lookups, and units still open once a ring has more cells
+  than that kind has units, brute-force against that kind instead.
+- Movement: wall reflection and block push-out for all units at once.
+- Conversions: touching pairs come from a finer grid of contact-radius cells. All conversions in a
+  tick are decided from the kinds at the start of the phase, so (unlike the
+  Python engine) a unit converted this tick doesn't convert others until the
+  next tick.
+
+Results are deterministic for a given seed, but differ from the Python
+engine's because the random draws and conversion chaining differ.
+"""
+
+import numpy as np
+
+from . import RADIUS, MIN_SEP, DEFAULT_PHYSICS
+
+_NEIGHBOR_OFFSETS = [(ox, oy) for oy in (-1, 0, 1) for ox in (-1, 0, 1)]
+_CHUNK_ELEMENTS = 4000000  # max distance-matrix size per brute-force chunk
+_UNITS_PER_CELL = 8        # target average grid occupancy
+_BRUTE_FORCE_ELEMENTS = 200000  # below this, nearest-target lookups skip the ring search
+
+
+def _ring_offsets(ring, _cache={}):
+    """(ox, oy) arrays of the cells at Chebyshev distance `ring` from a cell."""
+    if ring not in _cache:
+        side = np.arange(-ring, ring + 1)
+        ox, oy = np.meshgrid(side, side)
+        edge = np.maximum(np.abs(ox), np.abs(oy)) == ring
+        _cache[ring] = (ox[edge].astype(np.int64), oy[edge].astype(np.int64))
+    return _cache[ring]
+
+
+def _cap_speed(vx, vy, cap):
+    s = np.hypot(vx, vy)
+    scale = np.where(s > cap, cap / np.where(s > 0, s, 1.0), 1.0)
+    return vx * scale, vy * scale
+
+
+class NumpyEngine(object):
+    def __init__(self, width, height, kinds_order, beats, seed, physics=None):
+        self.width = float(width)
+        self.height = float(height)
+        physics = dict(DEFAULT_PHYSICS, **(physics or {}))
+        self.base_speed = float(physics["base_speed"])
+        self.attraction = float(physics["attraction"])
+        self.repulsion = float(physics["repulsion"])
+        self.ally_repel = float(physics["ally_repel"])
+        self.wall_bounce = float(physics["wall_bounce"])
+        self.jitter = float(physics["jitter"])
+        self.kinds_order = list(kinds_order)
+        k = len(self.kinds_order)
+        code = dict((name, i) for i, name in enumerate(self.kinds_order))
+        # wins[a, b] is True when kind a beats kind b
+        self.wins = np.zeros((k, k), dtype=bool)
+        for a, b in beats.items():
+            if a in code and b in code:
+                self.wins[code[a], code[b]] = True
+        self.prey_code = np.array([code.get(beats.get(n), -1) for n in self.kinds_order], dtype=np.int64)
+        loses_to = dict((b, a) for a, b in beats.items())
+        self.pred_code = np.array([code.get(loses_to.get(n), -1) for n in self.kinds_order], dtype=np.int64)
+        self.code = code
+        self.rng = np.random.default_rng(seed)
+
+        self._size_grid(0)
+
+        self.blocks = np.zeros((0, 4))
+        empty = np.zeros(0)
+        self.x = self.y = self.vx = self.vy = empty
+        self.kind = np.zeros(0, dtype=np.int64)
+
+    def _size_grid(self, n):
+        area = self.width * self.height
+        self.cell = max(float(MIN_SEP), float(np.sqrt(area * _UNITS_PER_CELL / max(n, 1))))
+
+    # ---------------- State transfer ----------------
+    def load(self, units, blocks):
+        """Copy unit and block state from the arena's Emoji/dict lists."""
+        self.x = np.array([u.x for u in units], dtype=float)
+        self.y = np.array([u.y for u in units], dtype=float)
+        self.vx = np.array([u.vx for u in units], dtype=float)
+        self.vy = np.array([u.vy for u in units], dtype=float)
+        self.kind = np.array([self.code[u.kind] for u in units], dtype=np.int64)
+        self._size_grid(len(units))
+        self.blocks = np.array([[b["x1"] - RADIUS, b["y1"] - RADIUS,
+                                 b["x2"] + RADIUS, b["y2"] + RADIUS] for b in blocks],
+                               dtype=float).reshape(-1, 4)
+
+    def store(self, units):
+        """Write positions, velocities and kinds back into Emoji objects."""
+        for i, u in enumerate(units):
+            u.x = float(self.x[i])
+            u.y = float(self.y[i])
+            u.vx = float(self.vx[i])
+            u.vy = float(self.vy[i])
+            u.kind = self.kinds_order[self.kind[i]]
+
+    def counts(self):
+        """Number of units of each kind, in kinds_order."""
+        return np.bincount(self.kind, minlength=len(self.kinds_order))
+
+    # ---------------- Grid ----------------
+    def _pairs(self, size):
+        """
+        Candidate (i, j) index pairs for a grid of `size`-wide cells: each unit
+        against every other unit in its 3x3 block of cells. Pairs come out
+        sorted by i.
+        """
+        n = len(self.x)
+        cols = max(1, int(np.ceil(self.width / size)))
+        rows = max(1, int(np.ceil(self.height / size)))
+        cx = np.clip((self.x // size).astype(np.int64), 0, cols - 1) + 1
+        cy = np.clip((self.y // size).astype(np.int64), 0, rows - 1) + 1
+        stride = cols + 2  # one empty cell of padding on every side
+        cell = cy * stride + cx
+        order = np.argsort(cell, kind="stable")
+        counts = np.bincount(cell, minlength=stride * (rows + 2))
+        starts = np.cumsum(counts) - counts
+
+        offs = np.array([oy * stride + ox for ox, oy in _NEIGHBOR_OFFSETS], dtype=np.int64)
+        nbr = (cell[:, None] + offs[None, :]).ravel()
+        lens = counts[nbr]
+        total = int(lens.sum())
+        seg_start = np.cumsum(lens) - lens
+        pi = np.repeat(np.arange(n), lens.reshape(n, -1).sum(axis=1))
+        pj = order[np.repeat(starts[nbr] - seg_start, lens) + np.arange(total)]
+        keep = pi != pj
+        return pi[keep], pj[keep]
+
+    # ---------------- Forces ----------------
+    def _nearest_of_kind(self, pi, pj, pk, d2, target):
+        """
+        Nearest unit of kind `target[i]` for each unit i (-1 if none). Units
+        whose best candidate is farther than one cell (or missing) are resolved
+        exactly by _nearest_by_rings().
+        """
+        n = len(self.x)
+        m = pk == target[pi]
+        qi, qj, qd = pi[m], pj[m], d2[m]
+        best = np.full(n, -1, dtype=np.int64)
+        best_d2 = np.full(n, np.inf)
+        if len(qi):
+            # qi is sorted, so each unit's candidates form one contiguous run
+            first = np.flatnonzero(np.concatenate(([True], qi[1:] != qi[:-1])))
+            seg_min = np.minimum.reduceat(qd, first)
+            owner = qi[first]
+            best_d2[owner] = seg_min
+            hit = np.flatnonzero(qd == np.repeat(seg_min, np.diff(np.append(first, len(qi)))))
+            # keep the first hit per unit
+            hit = hit[np.concatenate(([True], qi[hit][1:] != qi[hit][:-1]))]
+            best[qi[hit]] = qj[hit]
+
+        unsure = (best_d2 > self.cell * self.cell) & (target >= 0)
+        for t in np.unique(target[unsure]):
+            r = np.nonzero(unsure & (target == t))[0]
+            cols = np.nonzero(self.kind == t)[0]
+            if len(cols) == 0:
+                best[r] = -1
+                best_d2[r] = np.inf
+                continue
+            best[r], best_d2[r] = self._nearest_by_rings(r, cols, best[r], best_d2[r])
+        return best, best_d2
+
+    def _nearest_by_rings(self, r, cols, best, best_d2):
+        """
+        Nearest of units `cols` (all of one kind) to each unit in `r`, exactly:
+        (index or -1, squared distance) arrays, starting from `best` and
+        `best_d2`, the nearest in each unit's 3x3 block of cells. Searches a
+        grid of `cols` ring of cells by ring outwards from there. A unit is
+        done once its best is no farther than the edge of the square of cells
+        searched so far. Units still open when a ring would have more cells
+        than there are `cols` (or all of them, when `r` x `cols` is small) are
+        brute-forced against all of `cols`.
+        """
+        best = best.copy()
+        best_d2 = best_d2.copy()
+        active = np.arange(len(r))
+        if len(r) * len(cols) > _BRUTE_FORCE_ELEMENTS:
+            active = self._search_rings(r, cols, best, best_d2)
+
+        if len(active):
+            rr_all = r[active]
+            step = max(1, _CHUNK_ELEMENTS // len(cols))
+            for s in range(0, len(rr_all), step):
+                rr = rr_all[s:s + step]
+                dx = self.x[rr, None] - self.x[None, cols]
+                dy = self.y[rr, None] - self.y[None, cols]
+                d = dx * dx + dy * dy
+                d[rr[:, None] == cols[None, :]] = np.inf
+                jj = np.argmin(d, axis=1)
+                bd = d[np.arange(len(rr)), jj]
+                idx = active[s:s + step]
+                best[idx] = np.where(np.isfinite(bd), cols[jj], -1)
+                best_d2[idx] = bd
+        return best, best_d2
+
+    def _search_rings(self, r, cols, best, best_d2):
+        """
+        Ring-by-ring part of _nearest_by_rings(): updates `best`/`best_d2` in
+        place and returns the positions in `r` of the units left unresolved.
+        """
+        size = self.cell
+        ncols = max(1, int(np.ceil(self.width / size)))
+        nrows = max(1, int(np.ceil(self.height / size)))
+        cell = (np.clip((self.y[cols] // size).astype(np.int64), 0, nrows - 1) * ncols +
+                np.clip((self.x[cols] // size).astype(np.int64), 0, ncols - 1))
+        order = cols[np.argsort(cell, kind="stable")]
+        counts = np.bincount(cell, minlength=ncols * nrows)
+        starts = np.cumsum(counts) - counts
+        px, py = self.x[r], self.y[r]
+        ux = np.clip((px // size).astype(np.int64), 0, ncols - 1)
+        uy = np.clip((py // size).astype(np.int64), 0, nrows - 1)
+
+        active = np.arange(len(r))
+        ring = 1  # the 3x3 block is already searched
+        while len(active):
+            if ring > 1:
+                ox, oy = _ring_offsets(ring)
+                if len(ox) > len(cols):
+                    break
+                self._search_ring(r, active, ox, oy, px, py, ux, uy, ncols, nrows,
+                                  order, counts, starts, best, best_d2)
+            # Distance from each unit to the nearest unsearched cell (none past the grid's edges)
+            a = active
+            gaps = np.stack([np.where(ux[a] - ring > 0, px[a] - (ux[a] - ring) * size, np.inf),
+                             np.where(ux[a] + ring < ncols - 1, (ux[a] + ring + 1) * size - px[a], np.inf),
+                             np.where(uy[a] - ring > 0, py[a] - (uy[a] - ring) * size, np.inf),
+                             np.where(uy[a] + ring < nrows - 1, (uy[a] + ring + 1) * size - py[a], np.inf)])
+            reach = gaps.min(axis=0)
+            active = a[~(best_d2[a] <= reach * reach)]
+            ring += 1
+        return active
+
+    def _search_ring(self, r, active, ox, oy, px, py, ux, uy, ncols, nrows, order, counts, starts,
+                     best, best_d2):
+        """
+        Update `best`/`best_d2` (in place) of the `active` units in `r` with the
+        units in the cells at offsets (ox, oy) from theirs. Ties go to the
+        lowest index, as in the brute-force search.
+        """
+        step = max(1, _CHUNK_ELEMENTS // (len(ox) * _UNITS_PER_CELL))
+        for s in range(0, len(active), step):
+            a = active[s:s + step]
+            gx = ux[a, None] + ox[None, :]
+            gy = uy[a, None] + oy[None, :]
+            inside = (gx >= 0) & (gx < ncols) & (gy >= 0) & (gy < nrows)
+            g = np.where(inside, gy * ncols + gx, 0)
+            lens = np.where(inside, counts[g], 0).ravel()
+            total = int(lens.sum())
+            if total == 0:
+                continue
+            seg_start = np.cumsum(lens) - lens
+            owner = np.repeat(np.repeat(a, len(ox)), lens)
+            cand = order[np.repeat(starts[g.ravel()] - seg_start, lens) + np.arange(total)]
+            dx = px[owner] - self.x[cand]
+            dy = py[owner] - self.y[cand]
+            d = dx * dx + dy * dy
+            # Per owner: smallest distance, then lowest index
+            k = np.lexsort((cand, d, owner))
+            first = k[np.concatenate(([True], owner[k][1:] != owner[k][:-1]))]
+            o, c, dd = owner[first], cand[first], d[first]
+            better = (dd < best_d2[o]) | ((dd == best_d2[o]) & (c < best[o]))
+            best[o[better]] = c[better]
+            best_d2[o[better]] = dd[better]
+
+    def _forces(self):
+        n = len(self.x)
+        pi, pj = self._pairs(self.cell)
+        dx = self.x[pi] - self.x[pj]
+        dy = self.y[pi] - self.y[pj]
+        d2 = dx * dx + dy * dy
+        pk = self.kind[pj]
+
+        prey, prey_d2 = self._nearest_of_kind(pi, pj, pk, d2, self.prey_code[self.kind])
+        pred, pred_d2 = self._nearest_of_kind(pi, pj, pk, d2, self.pred_code[self.kind])
+
+        has_prey = prey >= 0
+        has_pred = pred >= 0
+        chase = has_prey & (~has_pred | (prey_d2 <= pred_d2))
+        flee = has_pred & ~chase
+
+        tgt = np.where(chase, prey, np.where(flee, pred, 0))
+        ddx = np.where(chase, self.x[tgt] - self.x, self.x - self.x[tgt])
+        ddy = np.where(chase, self.y[tgt] - self.y, self.y - self.y[tgt])
+        mag = np.hypot(ddx, ddy)
+        mag = np.where(mag > 0, mag, np.inf)
+        gain = np.where(chase, self.attraction, np.where(flee, self.repulsion, 0.0))
+        fx = ddx / mag * gain
+        fy = ddy / mag * gain
+
+        # mild ally repel within short range
+        ally = (pk == self.kind[pi]) & (d2 < MIN_SEP * MIN_SEP)
+        ai = pi[ally]
+        dist = np.sqrt(d2[ally])
+        inv = np.where(dist > 0, 1.0 / np.where(dist > 0, dist, 1.0), 0.0)
+        strength = self.ally_repel * (float(MIN_SEP) / np.maximum(dist, 1.0))
+        fx += np.bincount(ai, weights=dx[ally] * inv * strength, minlength=n)
+        fy += np.bincount(ai, weights=dy[ally] * inv * strength, minlength=n)
+
+        jitter = self.rng.uniform(-self.jitter, self.jitter, size=(2, n))
+        return fx + jitter[0], fy + jitter[1]
+
+    # ---------------- Movement ----------------
+    def _move(self):
+        nx = self.x + self.vx
+        ny = self.y + self.vy
+        lo_x, hi_x = RADIUS, self.width - RADIUS
+        lo_y, hi_y = RADIUS, self.height - RADIUS
+
+        bx_lo, bx_hi = nx < lo_x, nx > hi_x
+        by_lo, by_hi = ny < lo_y, ny > hi_y
+        nx = np.where(bx_lo, 2 * lo_x - nx, np.where(bx_hi, 2 * hi_x - nx, nx))
+        ny = np.where(by_lo, 2 * lo_y - ny, np.where(by_hi, 2 * hi_y - ny, ny))
+        hit_x = bx_lo | bx_hi
+        hit_y = by_lo | by_hi
+        self.vx = np.where(hit_x, -self.vx * self.wall_bounce, self.vx)
+        self.vy = np.where(hit_y, -self.vy * self.wall_bounce, self.vy)
+        bounced = hit_x | hit_y
+
+        # Blocks: push the center out of the first containing expanded rectangle
+        if len(self.blocks):
+            b = self.blocks
+            for _ in range(2):
+                inside = ((b[None, :, 0] <= nx[:, None]) & (nx[:, None] <= b[None, :, 2]) &
+                          (b[None, :, 1] <= ny[:, None]) & (ny[:, None] <= b[None, :, 3]))
+                hit = inside.any(axis=1)
+                if not hit.any():
+                    break
+                idx = np.nonzero(hit)[0]
+                first = b[np.argmax(inside[idx], axis=1)]
+                px, py = nx[idx], ny[idx]
+                gaps = np.stack([np.abs(px - first[:, 0]), np.abs(px - first[:, 2]),
+                                 np.abs(py - first[:, 1]), np.abs(py - first[:, 3])], axis=1)
+                side = np.argmin(gaps, axis=1)
+                vx, vy = self.vx[idx], self.vy[idx]
+                nx[idx] = np.where(side == 0, first[:, 0], np.where(side == 1, first[:, 2], px))
+                ny[idx] = np.where(side == 2, first[:, 1], np.where(side == 3, first[:, 3], py))
+                self.vx[idx] = np.where(side == 0, -np.abs(vx) * self.wall_bounce,
+                                        np.where(side == 1, np.abs(vx) * self.wall_bounce, vx))
+                self.vy[idx] = np.where(side == 2, -np.abs(vy) * self.wall_bounce,
+                                        np.where(side == 3, np.abs(vy) * self.wall_bounce, vy))
+                bounced[idx] = True
+
+        nb = int(bounced.sum())
+        if nb:
+            noise = self.rng.uniform(-0.2, 0.2, size=(2, nb))
+            vx = self.vx[bounced] + noise[0]
+            vy = self.vy[bounced] + noise[1]
+            self.vx[bounced], self.vy[bounced] = _cap_speed(vx, vy, self.base_speed)
+        self.x, self.y = nx, ny
+
+    # ---------------- Conversions ----------------
+    def _conversions(self):
+        # Contact range is much shorter than the force grid's cells
+        r2 = float((RADIUS * 1.1) ** 2)
+        pi, pj = self._pairs(RADIUS * 1.1)
+        m = pj > pi
+        pi, pj = pi[m], pj[m]
+        dx = self.x[pi] - self.x[pj]
+        dy = self.y[pi] - self.y[pj]
+        touching = dx * dx + dy * dy <= r2
+        i, j = pi[touching], pj[touching]
+        if len(i) == 0:
+            return False
+        order = np.lexsort((j, i))
+        i, j = i[order], j[order]
+        ki, kj = self.kind[i], self.kind[j]
+        j_wins = self.wins[kj, ki]
+        i_wins = self.wins[ki, kj] & ~j_wins
+        losers = np.concatenate([i[j_wins], j[i_wins]])
+        winners = np.concatenate([kj[j_wins], ki[i_wins]])
+        if len(losers) == 0:
+            return False
+        pos = np.concatenate([np.nonzero(j_wins)[0], np.nonzero(i_wins)[0]])
+        # If several predators touch a unit, the first pair in i<j order decides
+        by_pair = np.argsort(pos, kind="stable")
+        losers, winners = losers[by_pair], winners[by_pair]
+        uniq, first = np.unique(losers, return_index=True)
+        self.kind[uniq] = winners[first]
+        return True
+
+    # ---------------- Tick ----------------
+    def _accelerate(self):
+        fx, fy = self._forces()
+        self.vx, self.vy = _cap_speed(self.vx + fx, self.vy + fy, self.base_speed)
+
+    def tick(self, timed=None):
+        """
+        Advance one tick. Returns True if any conversion happened. `timed` is
+        the arena's phase timer (timed(phase, fn)), or None to run untimed.
+        """
+        if len(self.x) == 0:
+            return False
+        if timed is None:
+            self._accelerate()
+            self._move()
+            return self._conversions()
+        timed("forces", self._accelerate)
+        timed("move", self._move)
+        return timed("collisions", self._conversions)
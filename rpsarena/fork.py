@@ -0,0 +1,191 @@
+"""
+Forked continuations: `rpsarena fork --seed S --tick T --runs 1000`
+
+Takes one position of a game (a Simulation at some tick) and plays it to
+the end many times, each continuation with its own RNG seed, so the
+jitter and other random draws differ from the fork on. The winner shares
+estimate each kind's win probability from that position.
+
+Continuations run on a process pool. Where the platform has os.fork (Linux,
+macOS), the workers are forked after the position is set up and inherit
+it copy-on-write: nothing is pickled per worker or per continuation, only
+the seeds go out and (seed, winner, steps) comes back. Elsewhere the
+position is sent once to each worker when it starts. Every continuation
+restores the position from a Simulation.snapshot() before playing.
+
+From Python:
+
+    sim = Simulation(800, 800, 50)
+    sim.reset(seed=7)
+    sim.step(1500)
+    results = fork_continuations(sim, runs=1000, jobs=8)
+    print(summarize(results, sim.kinds_order))
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+
+from . import (DEFAULT_WIDTH, DEFAULT_HEIGHT, DEFAULT_UNITS_PER_KIND, DEFAULT_BLOCKS, Simulation,
+               load_blocks_json)
+
+DEFAULT_RUNS = 1000
+
+_position = None  # (Simulation, snapshot bytes) in this process's continuations
+
+
+def _set_position(sim, data):
+    global _position
+    _position = (sim, data)
+
+
+def _continue(job):
+    """Play one continuation of _position with RNG seed `seed`. Returns (seed, winner, steps)."""
+    seed, max_steps = job
+    sim, data = _position
+    sim.restore(data)
+    sim.rng.seed(seed)
+    limit = None if max_steps is None else sim.step_num + max_steps
+    while sim.winner() is None and (limit is None or sim.step_num < limit):
+        sim.tick()
+    return seed, sim.winner(), sim.step_num
+
+
+def fork_continuations(sim, runs=DEFAULT_RUNS, seeds=None, jobs=None, max_steps=None):
+    """
+    Play `runs` continuations of `sim`'s current position to the end, with
+    RNG seeds `seeds` (default 1..runs), on `jobs` worker processes (default:
+    CPU count; 1 plays them here). A continuation that hasn't ended after
+    `max_steps` more ticks stops with winner None. Returns (seed, winner,
+    final step) per continuation, in seed order; `sim` is left as it was.
+    """
+    seeds = list(seeds) if seeds is not None else list(range(1, int(runs) + 1))
+    jobs = max(1, int(jobs or os.cpu_count() or 1))
+    data = sim.snapshot()
+    work = [(seed, max_steps) for seed in seeds]
+    if jobs == 1 or len(work) <= 1:
+        _set_position(sim, data)
+        try:
+            return [_continue(job) for job in work]
+        finally:
+            sim.restore(data)
+            _set_position(None, None)
+
+    chunksize = max(1, len(work) // (jobs * 8))
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Forked workers inherit the position copy-on-write
+        _set_position(sim, data)
+        try:
+            with multiprocessing.get_context("fork").Pool(jobs) as pool:
+                return pool.map(_continue, work, chunksize)
+        finally:
+            _set_position(None, None)
+    with multiprocessing.get_context("spawn").Pool(jobs, initializer=_set_position,
+                                                   initargs=(sim, data)) as pool:
+        return pool.map(_continue, work, chunksize)
+
+
+def _percentile(values, q):
+    """Nearest-rank percentile of sorted `values`."""
+    return values[min(len(values) - 1, max(0, int(math.ceil(q * len(values))) - 1))]
+
+
+def summarize(results, kinds, fork_step=0):
+    """
+    Aggregate fork_continuations() results: wins and win share per kind
+    (over the continuations that finished) and the distribution of the
+    ticks each took after the fork.
+    """
+    finished = [(winner, steps - fork_step) for _, winner, steps in results if winner is not None]
+    wins = dict((k, 0) for k in kinds)
+    for winner, _ in finished:
+        wins[winner] += 1
+    summary = {"runs": len(results), "finished": len(finished), "fork_step": fork_step,
+               "wins": wins,
+               "win_share": dict((k, n / len(finished) if finished else 0.0) for k, n in wins.items())}
+    ticks = sorted(t for _, t in finished)
+    if ticks:
+        summary["ticks"] = {"mean": sum(ticks) / len(ticks), "median": _percentile(ticks, 0.5),
+                            "p10": _percentile(ticks, 0.1), "p90": _percentile(ticks, 0.9),
+                            "min": ticks[0], "max": ticks[-1]}
+    return summary
+
+
+def _advance(sim, tick=None, below=None):
+    """Play `sim` to `tick`, or until some kind is down to `below` units. Raises ValueError if it ends first."""
+    while sim.winner() is None:
+        if tick is not None and sim.step_num >= tick:
+            return
+        if below is not None and min(sim.kind_counts.values()) <= below:
+            return
+        sim.tick()
+    raise ValueError(f"The game ended at step {sim.step_num} ({sim.winner()} won) before the fork point.")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="rpsarena fork",
+                                description="Play one game position to the end many times with different "
+                                            "RNG seeds and report each kind's win share.")
+    p.add_argument("--seed", type=int, required=True, help="Seed of the game to fork.")
+    at = p.add_mutually_exclusive_group(required=True)
+    at.add_argument("--tick", type=int, metavar="T", help="Fork at tick T.")
+    at.add_argument("--when-below", type=int, metavar="N",
+                    help="Fork at the first tick where some kind is down to N units or fewer.")
+    p.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Continuations to play (default {DEFAULT_RUNS}).")
+    p.add_argument("--first-seed", type=int, default=1,
+                   help="Continuation k uses RNG seed FIRST_SEED+k (default 1).")
+    p.add_argument("--max-steps", type=int, default=None,
+                   help="Stop a continuation that hasn't ended after this many ticks (counted as unfinished).")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                   help="Worker processes (default: CPU count).")
+    p.add_argument("-s", "--size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                   default=(DEFAULT_WIDTH, DEFAULT_HEIGHT),
+                   help=f"Arena size (default {DEFAULT_WIDTH} {DEFAULT_HEIGHT}).")
+    p.add_argument("-u", "--units", type=int, default=DEFAULT_UNITS_PER_KIND,
+                   help=f"Units per kind (default {DEFAULT_UNITS_PER_KIND}).")
+    p.add_argument("--blocks", type=str, default=DEFAULT_BLOCKS,
+                   help="Number of random blocks OR path to a JSON blocks file.")
+    p.add_argument("--placement", choices=("random", "poisson"), default="random",
+                   help="Initial placement (default random).")
+    p.add_argument("--json", type=str, default=None, metavar="FILE",
+                   help="Also write the summary and every continuation's result to FILE as JSON; "
+                        "'-' for stdout (the table then goes to stderr).")
+    args = p.parse_args(argv)
+
+    try:
+        blocks = int(args.blocks) if args.blocks.strip().isdigit() else load_blocks_json(args.blocks)
+    except (OSError, ValueError) as e:
+        p.error(str(e))
+    sim = Simulation(args.size[0], args.size[1], args.units, blocks=blocks, placement=args.placement)
+    sim.reset(args.seed)
+    try:
+        _advance(sim, tick=args.tick, below=args.when_below)
+    except ValueError as e:
+        p.error(str(e))
+
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.json == "-" else print
+    counts = " ".join(f"{k}:{n}" for k, n in sim.kind_counts.items())
+    log(f"forking seed {args.seed} at step {sim.step_num}: {counts}")
+    seeds = range(args.first_seed, args.first_seed + max(1, args.runs))
+    results = fork_continuations(sim, seeds=seeds, jobs=args.jobs, max_steps=args.max_steps)
+    summary = summarize(results, sim.kinds_order, fork_step=sim.step_num)
+
+    log(f"{summary['runs']} continuations, {summary['finished']} finished")
+    for k in sim.kinds_order:
+        log(f"  {k:<10} wins={summary['wins'][k]:<6} share={summary['win_share'][k]:.3f}")
+    if "ticks" in summary:
+        t = summary["ticks"]
+        log(f"  ticks to finish: mean={t['mean']:.1f} median={t['median']} p10={t['p10']} "
+            f"p90={t['p90']} min={t['min']} max={t['max']}")
+    if args.json is not None:
+        out = dict(summary, seed=args.seed,
+                   results=[{"seed": s, "winner": w, "steps": n} for s, w, n in results])
+        if args.json == "-":
+            json.dump(out, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as f:
+                json.dump(out, f, indent=2)
@@ -0,0 +1,265 @@
+"""
+Trajectory recordings (--record FILE): every unit's position and kind at
+every tick, compact enough to keep long games and seekable by tick.
+
+Positions are quantized to 1/scale pixel and stored as int16 (int32 in
+the keyframes of arenas over 32767 px on a side). Ticks are grouped into
+blocks of `keyframe_every` ticks; each block starts with a full keyframe
+and then stores per-tick int16 deltas plus one byte per unit (0, or the
+new kind index + 1 when the unit converted). Blocks are compressed on
+their own (zlib or lzma), so reading tick T decompresses one block.
+
+The file is a stream of little-endian records, each starting with a
+one-byte tag; games follow one another:
+
+    G  u32 length, UTF-8 JSON settings (the log header's settings plus the
+       game's seed, blocks, scale, keyframe_type, keyframe_every and
+       compression)
+    B  i64 first tick, u32 ticks, u32 length, compressed block
+    I  i64 final tick, u32 count, then count x (i64 first tick, u64 offset)
+       -- the block index; offsets are relative to the game's G record
+
+Block layout before compression: x[n], y[n] (keyframe_type: "h" int16 or
+"i" int32), kind uint8[n] (the keyframe, at the first tick), then for each
+further tick dx int16[n], dy int16[n], converted uint8[n].
+
+read_recording() returns one Recording per game; Recording.frame(t) seeks
+through the index. Games cut off before their I record are indexed by
+scanning their B records.
+"""
+
+import array
+import bisect
+import json
+import lzma
+import os
+import struct
+import sys
+import zlib
+
+FORMAT_VERSION = 1
+DEFAULT_KEYFRAME_EVERY = 256
+INT16_MAX = 32767
+COMPRESSIONS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+_LEN = struct.Struct("<I")
+_BLOCK = struct.Struct("<qII")
+_INDEX = struct.Struct("<qI")
+_ENTRY = struct.Struct("<qQ")
+_SWAP = sys.byteorder != "little"  # arrays are native-endian; the file is little-endian
+
+
+def _pack(values, typecode="h"):
+    a = array.array(typecode, values)  # OverflowError if a value doesn't fit
+    if _SWAP:
+        a.byteswap()
+    return a.tobytes()
+
+
+def _unpack(data, start, n, typecode="h"):
+    a = array.array(typecode)
+    a.frombytes(data[start:start + a.itemsize * n])
+    if _SWAP:
+        a.byteswap()
+    return a
+
+
+class TrajectoryWriter(object):
+    """Writes recorded games to a binary file object `f` (see module docstring)."""
+    def __init__(self, f, compression="zlib", keyframe_every=DEFAULT_KEYFRAME_EVERY):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown recording compression '{compression}'. Expected one of: "
+                             f"{', '.join(COMPRESSIONS)}")
+        self.f = f
+        self.compression = compression
+        self._compress = COMPRESSIONS[compression][0]
+        self.keyframe_every = max(1, int(keyframe_every))
+        self._game_start = None
+
+    def begin_game(self, settings, units, width, height, step=0):
+        """Write the game's G record and start its first block with the units at tick `step`."""
+        side = max(int(width), int(height), 1)
+        if side > INT16_MAX:
+            # Too wide for int16 even at 1 px: int32 keyframes (deltas stay int16)
+            self.scale, self.keyframe_type = 8, "i"
+        else:
+            self.scale, self.keyframe_type = min(8, INT16_MAX // side), "h"
+        self.kind_index = dict((k, i) for i, k in enumerate(settings["kinds"]))
+        header = dict(settings, format=FORMAT_VERSION, scale=self.scale, keyframe_type=self.keyframe_type,
+                      keyframe_every=self.keyframe_every, compression=self.compression)
+        data = json.dumps(header, sort_keys=True).encode("utf-8")
+        self._game_start = self.f.tell()
+        self.f.write(b"G" + _LEN.pack(len(data)) + data)
+        self.index = []
+        self._keyframe(step, units)
+
+    def _quantize(self, units):
+        s = self.scale
+        return [int(round(u.x * s)) for u in units], [int(round(u.y * s)) for u in units]
+
+    def _keyframe(self, step, units):
+        self._qx, self._qy = self._quantize(units)
+        self._kinds = [self.kind_index[u.kind] for u in units]
+        self._first = step
+        self._ticks = 1
+        t = self.keyframe_type
+        self._buf = [_pack(self._qx, t), _pack(self._qy, t), bytes(self._kinds)]
+
+    def add(self, step, units):
+        """Record the units after tick `step` (ticks must be added in order)."""
+        if self._ticks >= self.keyframe_every:
+            self._flush()
+            self._keyframe(step, units)
+            return
+        qx, qy = self._quantize(units)
+        try:
+            dx = _pack([a - b for a, b in zip(qx, self._qx)])
+            dy = _pack([a - b for a, b in zip(qy, self._qy)])
+        except OverflowError:
+            # A jump too large for a delta: start a new block instead
+            self._flush()
+            self._keyframe(step, units)
+            return
+        index = self.kind_index
+        old = self._kinds
+        kinds = [index[u.kind] for u in units]
+        changed = bytes(k + 1 if k != o else 0 for k, o in zip(kinds, old))
+        self._qx, self._qy, self._kinds = qx, qy, kinds
+        self._buf += (dx, dy, changed)
+        self._ticks += 1
+
+    def _flush(self):
+        data = self._compress(b"".join(self._buf))
+        self.index.append((self._first, self.f.tell() - self._game_start))
+        self.f.write(b"B" + _BLOCK.pack(self._first, self._ticks, len(data)) + data)
+        self._buf = []
+
+    def end_game(self, step):
+        """Write the last block and the game's index."""
+        self._flush()
+        self.f.write(b"I" + _INDEX.pack(step, len(self.index)) +
+                     b"".join(_ENTRY.pack(t, off) for t, off in self.index))
+        self.f.flush()
+        self._game_start = None
+
+    def close(self):
+        """Close the file. A game still in progress keeps its blocks so far, without an index."""
+        if self._game_start is not None:
+            self._flush()
+            self._game_start = None
+        self.f.close()
+
+
+class Recording(object):
+    """One recorded game. frame(t) returns (xs, ys, kinds) at tick t."""
+    def __init__(self, path, offset, settings, index, final_tick):
+        self.path = path
+        self.offset = offset          # file offset of the game's G record
+        self.settings = settings
+        self.index = index            # [(first tick, offset from G)]
+        self.final_tick = final_tick  # None if the game was cut off
+        self.scale = float(settings["scale"])
+        self.keyframe_type = settings.get("keyframe_type", "h")
+        self.kinds = settings["kinds"]
+        self.n = settings["total_units"]
+        self._decompress = COMPRESSIONS[settings["compression"]][1]
+        self._starts = [t for t, _ in index]
+        self._cached = None
+
+    @property
+    def last_tick(self):
+        """Last tick stored (final_tick, or the last complete block's end if cut off)."""
+        if self.final_tick is not None:
+            return self.final_tick
+        first, ticks, _ = self._block(len(self.index) - 1)
+        return first + ticks - 1
+
+    def _block(self, i):
+        """(first tick, ticks, raw bytes) of block i, decompressed (the last one is cached)."""
+        if self._cached is not None and self._cached[0] == i:
+            return self._cached[1]
+        with open(self.path, "rb") as f:
+            f.seek(self.offset + self.index[i][1])
+            tag = f.read(1)
+            first, ticks, length = _BLOCK.unpack(f.read(_BLOCK.size))
+            if tag != b"B":
+                raise ValueError(f"Invalid recording: no block at offset {self.offset + self.index[i][1]}")
+            raw = self._decompress(f.read(length))
+        block = (first, ticks, raw)
+        self._cached = (i, block)
+        return block
+
+    def frame(self, t):
+        """Unit positions and kinds after tick t: (xs, ys, kinds) lists."""
+        i = bisect.bisect_right(self._starts, t) - 1
+        if i < 0:
+            raise ValueError(f"Tick {t} is not in this recording")
+        first, ticks, raw = self._block(i)
+        if t >= first + ticks:
+            raise ValueError(f"Tick {t} is not in this recording (last tick {self.last_tick})")
+        n = self.n
+        t_key = self.keyframe_type
+        qx = _unpack(raw, 0, n, t_key)
+        size = qx.itemsize * n
+        qy = _unpack(raw, size, n, t_key)
+        kinds = bytearray(raw[2 * size:2 * size + n])
+        per_tick = 5 * n
+        for k in range(t - first):
+            base = 2 * size + n + k * per_tick
+            dx = _unpack(raw, base, n)
+            dy = _unpack(raw, base + 2 * n, n)
+            qx = array.array(t_key, [a + b for a, b in zip(qx, dx)])
+            qy = array.array(t_key, [a + b for a, b in zip(qy, dy)])
+            changed = raw[base + 4 * n:base + 5 * n]
+            if changed.count(0) != n:
+                for j, c in enumerate(changed):
+                    if c:
+                        kinds[j] = c - 1
+        s = self.scale
+        names = self.kinds
+        return [x / s for x in qx], [y / s for y in qy], [names[k] for k in kinds]
+
+
+def read_recording(path):
+    """Index a recording file and return a list of Recording, one per game, in file order."""
+    games = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        current = None
+        while True:
+            pos = f.tell()
+            tag = f.read(1)
+            if not tag:
+                break
+            if tag == b"G":
+                head = f.read(_LEN.size)
+                if len(head) < _LEN.size:
+                    break
+                (length,) = _LEN.unpack(head)
+                settings = json.loads(f.read(length).decode("utf-8"))
+                current = {"offset": pos, "settings": settings, "blocks": []}
+                games.append(current)
+            elif tag == b"B":
+                head = f.read(_BLOCK.size)
+                if len(head) < _BLOCK.size or current is None:
+                    break
+                first, ticks, length = _BLOCK.unpack(head)
+                if f.tell() + length > size:
+                    break  # truncated trailing block
+                f.seek(length, 1)
+                current["blocks"].append((first, pos - current["offset"]))
+            elif tag == b"I":
+                head = f.read(_INDEX.size)
+                if len(head) < _INDEX.size or current is None:
+                    break
+                final, count = _INDEX.unpack(head)
+                data = f.read(count * _ENTRY.size)
+                current["index"] = [_ENTRY.unpack_from(data, k * _ENTRY.size) for k in range(count)]
+                current["final"] = final
+            else:
+                raise ValueError(f"Invalid recording: unknown record tag {tag!r} at offset {pos}")
+    return [Recording(path, g["offset"], g["settings"], g.get("index", g["blocks"]), g.get("final"))
+            for g in games if g.get("index", g["blocks"])]
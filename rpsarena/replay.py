@@ -0,0 +1,402 @@
+"""
+Replays by re-simulation: `rpsarena replay --log FILE --game K`
+
+A game is rebuilt from its log header alone (size, units, kinds, blocks,
+physics, placement and seed): the simulation is deterministic, so running
+it again from the seed gives the same positions and conversions at every
+tick, and nothing per tick has to be stored.
+
+The replay runs without rendering up to the requested tick, keeping an
+in-memory checkpoint (units, RNG state and step) every N ticks, and then
+shows the game in a Tk viewer. Seeking restores the nearest checkpoint at
+or before the target and re-runs the ticks from there. The conversion
+rows the replay produces are checked against the log's as it goes.
+
+Viewer keys: Space play/pause, Right/Left one tick, Up/Down one checkpoint
+interval, Home/End first/last tick. The slider seeks anywhere.
+
+Only seeded games (--seed) played on the python engine with the default
+kinds can be replayed; JSON blocks are read again from their logged path.
+The game a --resume'd run picked up mid-game can't be: its log starts at
+the snapshot's step (the header's resumed_at), not at tick 0.
+"""
+
+import argparse
+import collections
+import re
+import sys
+
+from . import (DEFAULT_BACKGROUND, DEFAULT_BEATS, DEFAULT_EMOJI, DEFAULT_LOSES_TO, DEFAULT_PHYSICS,
+               FONT_SIZE, RENDER_PROC, _RENDER_PROC_TCL, Simulation, load_blocks_json,
+               pick_contrast_color)
+
+DEFAULT_CHECKPOINT_EVERY = 1000
+
+_ROW = re.compile(r"^\d+(,\d+)+$")
+_STEPS = re.compile(r"steps=(\d+)")
+_RANDOM_BLOCKS = re.compile(r"^random\((\d+)\)$")
+
+LoggedGame = collections.namedtuple("LoggedGame", "settings seed rows end_step resumed_at")
+LoggedGame.__doc__ = """
+One game from a log. `settings` are its run's header settings, `seed` the
+game's own seed (None if the run wasn't seeded), `rows` its conversion
+rows as {step: counts in kinds order}, `end_step` None if the game has no
+game_end line (the run was killed), and `resumed_at` the step a --resume'd
+run restored it at (None for games played from the start).
+"""
+
+
+# ---------------- Reading logs ----------------
+def _parse_text_header(line):
+    """The binary header's settings, from a text log header line."""
+    fields = {}
+    for part in line.split(" | "):
+        key, _, value = part.partition("=")
+        fields[key.strip()] = value.strip()
+    width, height = fields["size"].split("x")
+    physics = dict(DEFAULT_PHYSICS)
+    if fields.get("physics"):
+        for item in fields["physics"].split(","):
+            key, _, value = item.partition(":")
+            physics[key] = float(value)
+    seed = fields.get("seed", "random")
+    return {"size": [int(width), int(height)],
+            "units_per_kind": int(fields["units_per_kind"]),
+            "delay_ms": int(fields["delay_ms"]),
+            "seed": None if seed == "random" else int(seed),
+            "kinds": fields["kinds"].split(","),
+            "blocks": fields.get("blocks", "none"),
+            "physics": physics,
+            "placement": fields.get("placement", "random"),
+            "engine": fields.get("engine", "python"),
+            "resumed_at": int(fields["resumed_at"]) if "resumed_at" in fields else None,
+            "resumed_from": fields.get("resumed_from")}
+
+
+def _logged_game(settings, index, rows, end_step):
+    """
+    Game `index` (from 0) of the run with header `settings`; seeded runs
+    count seed+index, and only the first game of a resumed run is resumed.
+    """
+    seed = settings["seed"] + index if settings.get("seed") is not None else None
+    resumed_at = settings.get("resumed_at") if index == 0 else None
+    return LoggedGame(settings, seed, rows, end_step, resumed_at)
+
+
+def _read_text_log(path):
+    games = []
+    settings = None
+    rows = {}
+    index = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("start="):
+                if settings is not None and rows:
+                    games.append(_logged_game(settings, index, rows, None))
+                settings = _parse_text_header(line)
+                rows = {}
+                index = 0
+            elif settings is None:
+                continue
+            elif line.startswith("STEP,"):
+                settings["emoji"] = line.split(",")[1:]
+            elif _ROW.match(line):
+                values = [int(v) for v in line.split(",")]
+                rows[values[0]] = tuple(values[1:])
+            elif line.startswith("game_end"):
+                m = _STEPS.search(line)
+                games.append(_logged_game(settings, index, rows, int(m.group(1)) if m else None))
+                rows = {}
+                index += 1
+    if settings is not None and rows:
+        games.append(_logged_game(settings, index, rows, None))
+    return games
+
+
+def _read_binary_log(path):
+    from .binlog import read_binary_log
+    games = []
+    last = None
+    index = 0
+    for game in read_binary_log(path):
+        # Games of one run share its header's settings object
+        index = index + 1 if game.settings is last else 0
+        last = game.settings
+        settings = dict({"placement": "random", "engine": "python"}, **game.settings)
+        rows = dict((int(step), tuple(int(c) for c in counts))
+                    for step, counts in zip(game.steps, game.counts))
+        games.append(_logged_game(settings, index, rows, game.end_step))
+    return games
+
+
+def read_log(path):
+    """Return the games in a text or binary log as a list of LoggedGame, in file order."""
+    with open(path, "rb") as f:
+        binary = f.read(1) == b"H"
+    return _read_binary_log(path) if binary else _read_text_log(path)
+
+
+def _blocks_from_desc(desc):
+    """Simulation `blocks` for a logged --blocks setting ("none", "random(N)" or "json:PATH")."""
+    if desc.startswith("json:"):
+        return load_blocks_json(desc[len("json:"):])
+    m = _RANDOM_BLOCKS.match(desc)
+    return int(m.group(1)) if m else 0
+
+
+# ---------------- Re-simulation ----------------
+class Replayer(object):
+    """Re-simulates one logged game; seek(t) moves it to tick t through in-memory checkpoints."""
+    def __init__(self, game, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        settings = game.settings
+        if game.seed is None:
+            raise ValueError("This game was played without --seed, so its seed isn't in the log; "
+                             "replays need runs played with --seed.")
+        if game.resumed_at is not None:
+            raise ValueError(f"This game was resumed at step {game.resumed_at} from snapshot "
+                             f"{settings.get('resumed_from')}, so the log doesn't start it from its seed.")
+        if settings.get("engine", "python") != "python":
+            raise ValueError(f"Only python-engine games can be replayed (this one used {settings['engine']}).")
+        kinds = list(settings["kinds"])
+        if sorted(kinds) != sorted(DEFAULT_BEATS):
+            raise ValueError(f"Can't replay custom kinds ({', '.join(kinds)}): their rules aren't in the log.")
+        width, height = settings["size"]
+        self.game = game
+        self.kinds = kinds
+        self.sim = Simulation(width, height, settings["units_per_kind"], kinds=kinds,
+                              beats=DEFAULT_BEATS, loses_to=DEFAULT_LOSES_TO,
+                              blocks=_blocks_from_desc(settings["blocks"]),
+                              physics=settings["physics"], placement=settings.get("placement", "random"))
+        self.sim.reset(game.seed)
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        self.checkpoints = {0: self._checkpoint()}
+        self.rows = {}          # conversion rows produced so far, as in the log
+        self.simulated_to = 0   # furthest tick simulated
+        self.mismatch = None    # first step whose counts differ from the log
+
+    @property
+    def last_step(self):
+        """The game's last tick according to the log (its last row if it has no game_end)."""
+        if self.game.end_step is not None:
+            return self.game.end_step
+        return max(self.game.rows) if self.game.rows else 0
+
+    def _checkpoint(self):
+        sim = self.sim
+        return (sim.step_num, sim.rng.getstate(), [(u.kind, u.x, u.y, u.vx, u.vy) for u in sim.units])
+
+    def _restore(self, checkpoint):
+        sim = self.sim
+        sim.step_num, state, units = checkpoint
+        sim.rng.setstate(state)
+        for u, (kind, x, y, vx, vy) in zip(sim.units, units):
+            u.kind, u.x, u.y, u.vx, u.vy = kind, x, y, vx, vy
+        sim.converted_units = []
+        sim.recount()
+
+    def seek(self, t):
+        """Move the simulation to tick t, or to the game's end if that comes first. Returns the tick."""
+        sim = self.sim
+        t = max(0, int(t))
+        base = max(step for step in self.checkpoints if step <= t)
+        if t < sim.step_num or base > sim.step_num:
+            self._restore(self.checkpoints[base])
+        while sim.step_num < t and sim.winner() is None:
+            converted = sim.tick()
+            step = sim.step_num
+            if step % self.checkpoint_every == 0 and step not in self.checkpoints:
+                self.checkpoints[step] = self._checkpoint()
+            if step > self.simulated_to:
+                self.simulated_to = step
+                if converted:
+                    self._add_row(step)
+        return sim.step_num
+
+    def _add_row(self, step):
+        counts = tuple(self.sim.kind_counts[k] for k in self.kinds)
+        self.rows[step] = counts
+        if self.mismatch is None and self.game.rows.get(step) != counts:
+            self.mismatch = step
+
+    def check(self):
+        """
+        Re-simulate the rest of the game and compare it with the log.
+        Returns None if every conversion row and the end step match, else a
+        description of the first difference.
+        """
+        end = self.last_step
+        self.seek(end + 1)
+        steps = sorted(set(self.rows) | set(self.game.rows))
+        for step in steps:
+            if step > end:
+                break
+            if self.rows.get(step) != self.game.rows.get(step):
+                return (f"step {step}: replay counts {self.rows.get(step)}, "
+                        f"log counts {self.game.rows.get(step)}")
+        if self.game.end_step is not None and self.sim.step_num != self.game.end_step:
+            return f"replay ended at step {self.sim.step_num}, log at step {self.game.end_step}"
+        return None
+
+
+# ---------------- Viewer ----------------
+class ReplayViewer(object):
+    """Tk window showing a Replayer's game, with play/pause, stepping and a tick slider."""
+    def __init__(self, root, replayer, emoji, delay_ms, steps_per_frame=1, background=DEFAULT_BACKGROUND):
+        import tkinter as tk  # type: ignore
+        self.root = root
+        self.replayer = replayer
+        self.emoji = emoji
+        self.delay_ms = max(1, int(delay_ms))
+        self.steps_per_frame = max(1, int(steps_per_frame))
+        self.playing = False
+        self._after_id = None
+
+        sim = replayer.sim
+        self.canvas = tk.Canvas(root, width=sim.width, height=sim.height, bg=background, highlightthickness=0)
+        self.canvas.pack()
+        self.canvas.tk.eval(_RENDER_PROC_TCL)
+        text_color = pick_contrast_color(background, tk_root=root)
+        for b in sim.blocks:
+            color = b.get("color") or text_color
+            self.canvas.create_rectangle(b["x1"], b["y1"], b["x2"], b["y2"], fill=color, outline=color)
+        self.items = [self.canvas.create_text(u.x, u.y, text=emoji[u.kind], anchor="center",
+                                              font=("Apple Color Emoji", FONT_SIZE))
+                      for u in sim.units]
+        self.shown = [u.kind for u in sim.units]
+        self.status = self.canvas.create_text(sim.width - 5, sim.height - 5, anchor="se",
+                                              font=("Helvetica", 10), fill=text_color)
+        self.slider = tk.Scale(root, from_=0, to=replayer.last_step, orient="horizontal",
+                               showvalue=False, command=self._on_slider)
+        self.slider.pack(fill="x")
+
+        every = replayer.checkpoint_every
+        root.bind("<space>", lambda e: self.toggle())
+        root.bind("<Right>", lambda e: self.seek(sim.step_num + 1))
+        root.bind("<Left>", lambda e: self.seek(sim.step_num - 1))
+        root.bind("<Up>", lambda e: self.seek(sim.step_num + every))
+        root.bind("<Down>", lambda e: self.seek(sim.step_num - every))
+        root.bind("<Home>", lambda e: self.seek(0))
+        root.bind("<End>", lambda e: self.seek(replayer.last_step))
+        self.show()
+
+    def show(self):
+        """Draw the simulation's current tick: positions, changed kinds and the status line."""
+        sim = self.replayer.sim
+        coords = []
+        configs = []
+        for i, u in enumerate(sim.units):
+            coords += (self.items[i], u.x, u.y)
+            if self.shown[i] != u.kind:
+                self.shown[i] = u.kind
+                configs += (self.items[i], "-text", self.emoji[u.kind])
+        self.canvas.tk.call(RENDER_PROC, self.canvas._w, tuple(coords), tuple(configs))
+        counts = " ".join(f"{k}:{sim.kind_counts[k]}" for k in self.replayer.kinds)
+        text = f"seed={self.replayer.game.seed} step={sim.step_num}/{self.replayer.last_step} {counts}"
+        if not self.playing:
+            text += " [paused]"
+        if self.replayer.mismatch is not None:
+            text += f" (differs from log at step {self.replayer.mismatch})"
+        self.canvas.itemconfigure(self.status, text=text)
+        self.slider.set(sim.step_num)
+
+    def seek(self, t):
+        self.replayer.seek(min(max(0, t), self.replayer.last_step))
+        self.show()
+
+    def _on_slider(self, value):
+        if int(float(value)) != self.replayer.sim.step_num:
+            self.seek(int(float(value)))
+
+    def toggle(self):
+        self.playing = not self.playing
+        if self.playing and self._after_id is None:
+            self._after_id = self.root.after(self.delay_ms, self._play_frame)
+        self.show()
+
+    def _play_frame(self):
+        self._after_id = None
+        if not self.playing:
+            return
+        sim = self.replayer.sim
+        before = sim.step_num
+        self.replayer.seek(min(before + self.steps_per_frame, self.replayer.last_step))
+        if sim.step_num == before:  # reached the end
+            self.playing = False
+        else:
+            self._after_id = self.root.after(self.delay_ms, self._play_frame)
+        self.show()
+
+
+# ---------------- CLI ----------------
+def _describe(number, game):
+    rows = game.rows
+    last = rows[max(rows)] if rows else ()
+    left = [k for k, n in zip(game.settings["kinds"], last) if n]
+    winner = left[0] if game.end_step is not None and len(left) == 1 else "-"
+    width, height = game.settings["size"]
+    desc = (f"game {number}: seed={game.seed if game.seed is not None else 'random'} "
+            f"steps={game.end_step if game.end_step is not None else '?'} winner={winner} "
+            f"size={width}x{height} units_per_kind={game.settings['units_per_kind']} "
+            f"blocks={game.settings['blocks']}")
+    if game.resumed_at is not None:
+        desc += f" resumed_at={game.resumed_at}"
+    return desc
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="rpsarena replay",
+                                description="Replay a logged game by re-simulating it from its seed.")
+    p.add_argument("--log", required=True, metavar="FILE", help="Log file the game was written to (text or binary).")
+    p.add_argument("--game", type=int, default=1, metavar="K",
+                   help="Game to replay, counting from 1 in file order (default 1).")
+    p.add_argument("--list", action="store_true", help="List the games in the log and exit.")
+    p.add_argument("--tick", type=int, default=0, metavar="T",
+                   help="Open the viewer at tick T; ticks before it are simulated without rendering.")
+    p.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY, metavar="N",
+                   help=f"Keep an in-memory checkpoint every N ticks for seeking (default {DEFAULT_CHECKPOINT_EVERY}).")
+    p.add_argument("-d", "--delay", type=int, default=None,
+                   help="Playback delay per frame in ms (default: the game's --delay).")
+    p.add_argument("--steps-per-frame", type=int, default=1, metavar="K",
+                   help="Ticks per frame during playback (default 1).")
+    p.add_argument("--bg", type=str, default=DEFAULT_BACKGROUND, help="Background color (name or #RRGGBB).")
+    p.add_argument("--check", action="store_true",
+                   help="Re-simulate the whole game without a window and compare it with the log.")
+    args = p.parse_args(argv)
+
+    try:
+        games = read_log(args.log)
+    except (OSError, ValueError, KeyError) as e:
+        p.error(f"Failed to read log '{args.log}': {e}")
+    if args.list:
+        for number, game in enumerate(games, 1):
+            print(_describe(number, game))
+        return
+    if not 1 <= args.game <= len(games):
+        p.error(f"--game {args.game}: the log has {len(games)} game(s).")
+    game = games[args.game - 1]
+    try:
+        replayer = Replayer(game, checkpoint_every=args.checkpoint_every)
+    except ValueError as e:
+        p.error(f"Game {args.game} can't be replayed: {e}")
+
+    if args.check:
+        problem = replayer.check()
+        if problem is not None:
+            print(f"game {args.game} (seed {game.seed}): replay differs from the log: {problem}")
+            sys.exit(1)
+        print(f"game {args.game} (seed {game.seed}): replay matches the log "
+              f"({len(replayer.rows)} rows, {replayer.sim.step_num} steps)")
+        return
+
+    replayer.seek(min(max(0, args.tick), replayer.last_step))
+
+    import tkinter as tk  # type: ignore
+    root = tk.Tk()
+    root.title(f"RPS Arena replay: game {args.game} (seed {game.seed})")
+    root.resizable(False, False)
+    emoji = game.settings.get("emoji")
+    emoji = dict(zip(replayer.kinds, emoji)) if emoji else DEFAULT_EMOJI
+    delay_ms = args.delay if args.delay is not None else game.settings.get("delay_ms", 30)
+    ReplayViewer(root, replayer, emoji, delay_ms, steps_per_frame=args.steps_per_frame, background=args.bg)
+    root.mainloop()
@@ -0,0 +1,96 @@
+"""
+Binary snapshots of a game in progress (Simulation.snapshot(),
+RPSArena.snapshot(), --checkpoint-every and --resume).
+
+A snapshot holds everything the next tick depends on, so a restored game
+plays on exactly as the original would have. Layout (little-endian):
+
+    "RPSS", u16 version
+    u32 length, UTF-8 JSON: size, kinds, physics, step, blocks, the RNG's
+        version and gauss_next, and "extra" (the caller's own state, e.g.
+        the arena's games_played and seed)
+    u32 n, then x, y, vx, vy as float64[n] and kind as uint8[n] (index into kinds)
+    Mersenne Twister state: 625 x uint32
+
+Positions and velocities are stored as exact doubles: rounding them would
+change the game from the next tick on.
+"""
+
+import array
+import json
+import struct
+import sys
+
+MAGIC = b"RPSS"
+FORMAT_VERSION = 1
+
+_HEAD = struct.Struct("<4sH")
+_LEN = struct.Struct("<I")
+_SWAP = sys.byteorder != "little"  # arrays are native-endian; the file is little-endian
+
+
+def _to_bytes(typecode, values):
+    a = array.array(typecode, values)
+    if _SWAP:
+        a.byteswap()
+    return a.tobytes()
+
+
+def _from_bytes(typecode, data, start, n):
+    a = array.array(typecode)
+    end = start + n * a.itemsize
+    if end > len(data):
+        raise ValueError("Invalid snapshot: truncated data")
+    a.frombytes(data[start:end])
+    if _SWAP:
+        a.byteswap()
+    return a, end
+
+
+def pack(meta, units, rng_state):
+    """
+    Encode a snapshot. `meta` is the JSON part ("kinds" gives the kind
+    order), `units` the Emoji list and `rng_state` a random.Random state.
+    """
+    version, internal, gauss_next = rng_state
+    meta = dict(meta, rng_version=version, rng_gauss_next=gauss_next)
+    code = dict((k, i) for i, k in enumerate(meta["kinds"]))
+    data = json.dumps(meta, sort_keys=True).encode("utf-8")
+    parts = [_HEAD.pack(MAGIC, FORMAT_VERSION), _LEN.pack(len(data)), data, _LEN.pack(len(units))]
+    for attr in ("x", "y", "vx", "vy"):
+        parts.append(_to_bytes("d", [getattr(u, attr) for u in units]))
+    parts.append(bytes(code[u.kind] for u in units))
+    parts.append(_to_bytes("I", internal))
+    return b"".join(parts)
+
+
+def unpack(data):
+    """
+    Decode a snapshot. Returns (meta, columns, rng_state), where columns is
+    (kinds, x, y, vx, vy) with kinds as names. Raises ValueError if `data`
+    isn't a snapshot this version can read.
+    """
+    if len(data) < _HEAD.size + _LEN.size:
+        raise ValueError("Invalid snapshot: too short")
+    magic, version = _HEAD.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Invalid snapshot: bad magic")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version} (expected {FORMAT_VERSION})")
+    pos = _HEAD.size
+    (length,) = _LEN.unpack_from(data, pos)
+    pos += _LEN.size
+    meta = json.loads(bytes(data[pos:pos + length]).decode("utf-8"))
+    pos += length
+    (n,) = _LEN.unpack_from(data, pos)
+    pos += _LEN.size
+    floats = []
+    for _ in range(4):
+        column, pos = _from_bytes("d", data, pos, n)
+        floats.append(column)
+    codes, pos = _from_bytes("B", data, pos, n)
+    internal, pos = _from_bytes("I", data, pos, 625)
+    kinds = meta["kinds"]
+    names = [kinds[c] for c in codes]
+    rng_state = (meta.pop("rng_version"), tuple(internal), meta.pop("rng_gauss_next"))
+    return meta, (names,) + tuple(floats), rng_state
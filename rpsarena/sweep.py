@@ -0,0 +1,152 @@
+"""
+Parameter sweeps: `rpsarena sweep SPEC.json`
+
+Runs every config in a spec for every seed on a local process pool and
+writes one CSV row per game: config index, the swept settings, seed,
+winner, steps and elapsed seconds.
+
+Spec format (JSON), either a cartesian grid:
+
+    {"grid": {"base_speed": [1.8, 2.2], "units": [20, 50]}, "seeds": 10}
+
+or an explicit list of configs:
+
+    {"list": [{"units": 20}, {"units": 50, "jitter": 0.5}], "seeds": [1, 2, 3]}
+
+"seeds" is a list of seeds or a count N (seeds 1..N). Keys not given use
+the normal defaults. Settings that apply to every config can go in "fixed".
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from . import (DEFAULT_PHYSICS, DEFAULT_WIDTH, DEFAULT_HEIGHT, DEFAULT_UNITS_PER_KIND,
+               DEFAULT_BLOCKS, play_windowless_game)
+
+SWEEP_KEYS = ("units", "size", "blocks", "placement", "engine", "grid") + tuple(DEFAULT_PHYSICS)
+
+
+def load_spec(path):
+    """Read a sweep spec and return (configs, seeds)."""
+    try:
+        with open(path, "r") as f:
+            spec = json.load(f)
+    except Exception as e:
+        raise ValueError(f"Failed to read sweep spec: {e}")
+    if not isinstance(spec, dict):
+        raise ValueError("Invalid sweep spec: expected a JSON object.")
+
+    fixed = spec.get("fixed", {})
+    if not isinstance(fixed, dict):
+        raise ValueError("Invalid sweep spec: 'fixed' must be an object.")
+
+    if "grid" in spec:
+        grid = spec["grid"]
+        if not isinstance(grid, dict) or not all(isinstance(v, list) and v for v in grid.values()):
+            raise ValueError("Invalid sweep spec: 'grid' must map keys to non-empty lists.")
+        keys = list(grid.keys())
+        configs = [dict(zip(keys, values)) for values in itertools.product(*[grid[k] for k in keys])]
+    elif "list" in spec:
+        configs = spec["list"]
+        if not isinstance(configs, list) or not all(isinstance(c, dict) for c in configs):
+            raise ValueError("Invalid sweep spec: 'list' must be a list of objects.")
+    else:
+        raise ValueError("Invalid sweep spec: expected a 'grid' or 'list' key.")
+    configs = [dict(fixed, **c) for c in configs]
+
+    for i, c in enumerate(configs):
+        for key in c:
+            if key not in SWEEP_KEYS:
+                raise ValueError(f"Invalid sweep spec: config {i} has unknown key '{key}'. "
+                                 f"Expected one of: {', '.join(SWEEP_KEYS)}")
+
+    seeds = spec.get("seeds", 1)
+    if isinstance(seeds, int):
+        seeds = list(range(1, seeds + 1))
+    if not isinstance(seeds, list) or not seeds or not all(isinstance(s, int) for s in seeds):
+        raise ValueError("Invalid sweep spec: 'seeds' must be a positive count or a list of integers.")
+    return configs, seeds
+
+
+def arena_settings(config):
+    """Map a sweep config onto RPSArena constructor arguments."""
+    width, height = config.get("size", (DEFAULT_WIDTH, DEFAULT_HEIGHT))
+    return dict(width=int(width), height=int(height),
+                units_per_kind=int(config.get("units", DEFAULT_UNITS_PER_KIND)),
+                delay_ms=1,
+                blocks=str(config.get("blocks", DEFAULT_BLOCKS)),
+                placement=config.get("placement", "random"),
+                engine=config.get("engine", "python"),
+                spatial_grid=bool(config.get("grid", False)),
+                physics=dict((k, config[k]) for k in DEFAULT_PHYSICS if k in config))
+
+
+def play_game(settings, seed):
+    """Process-pool worker: play one seeded windowless game. Returns (winner, steps, elapsed)."""
+    arena = play_windowless_game(settings, seed)
+    elapsed = time.time() - arena.game_start_time
+    return arena.units[0].kind, arena.step_num, elapsed
+
+
+def _play(job):
+    return play_game(*job)
+
+
+def run_sweep(configs, seeds, out, jobs=1, quiet=False):
+    """Play every (config, seed) pair and write the results table as CSV to file object `out`."""
+    keys = []
+    for c in configs:
+        for k in c:
+            if k not in keys:
+                keys.append(k)
+    writer = csv.writer(out)
+    writer.writerow(["config"] + keys + ["seed", "winner", "steps", "elapsed"])
+
+    runs = [(i, seed) for i in range(len(configs)) for seed in seeds]
+    work = [(arena_settings(configs[i]), seed) for i, seed in runs]
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_play, work)
+    else:
+        pool = None
+        results = map(_play, work)
+    try:
+        for (i, seed), (winner, steps, elapsed) in zip(runs, results):
+            c = configs[i]
+            values = [json.dumps(c[k]) if isinstance(c.get(k), (list, dict)) else c.get(k, "") for k in keys]
+            writer.writerow([i] + values + [seed, winner, steps, f"{elapsed:.3f}"])
+            out.flush()
+            if not quiet:
+                print(f"config {i} seed {seed}: winner={winner} steps={steps} elapsed={elapsed:.3f}s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="rpsarena sweep",
+                                description="Run windowless games over a grid or list of settings.")
+    p.add_argument("spec", help="JSON sweep spec (see module docstring / README).")
+    p.add_argument("-o", "--out", type=str, default="sweep_results.csv",
+                   help="CSV results file (default sweep_results.csv); '-' for stdout.")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                   help="Worker processes (default: CPU count).")
+    p.add_argument("-q", "--quiet", action="store_true", help="Don't print a line per game.")
+    args = p.parse_args(argv)
+
+    try:
+        configs, seeds = load_spec(args.spec)
+    except ValueError as e:
+        p.error(str(e))
+
+    if args.out == "-":
+        run_sweep(configs, seeds, sys.stdout, jobs=max(1, args.jobs), quiet=True)
+    else:
+        with open(args.out, "w", newline="") as f:
+            run_sweep(configs, seeds, f, jobs=max(1, args.jobs), quiet=args.quiet)
@@ -0,0 +1,192 @@
+"""
+Offscreen frame rendering and video export for windowless games (--video).
+
+FrameRenderer draws the arena into one reused PIL image: the background
+and blocks are composited once per game, then each frame pastes the
+units' emoji sprites over a copy of that base. Frames go to a
+VideoWriter, which hands them to a separate encoder process so encoding
+runs alongside the simulation. The output format follows the file name:
+
+    *.png   one PNG per frame ("game.png" -> game_000000.png, game_000001.png, ...)
+            or a printf-style pattern such as "frames/%05d.png"
+    *.gif   animated GIF
+    other   piped to a local ffmpeg as raw RGB (e.g. .mp4, .webm, .mkv)
+"""
+
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+
+from . import (SPRITE_SIZE, load_emoji_font, rasterize_emoji,
+               pick_contrast_color_from_rgb, _rgb_from_name_or_hex)
+
+# Disc colors per kind when no color emoji font is available
+_FALLBACK_COLORS = [(214, 69, 65), (66, 133, 244), (52, 168, 83), (251, 188, 5),
+                    (171, 71, 188), (0, 172, 193), (255, 112, 67), (120, 144, 156)]
+
+_FRAME_QUEUE_SIZE = 8  # frames in flight to the encoder before the simulation waits
+
+
+def output_format(path):
+    """"png", "gif" or "ffmpeg", from the output file name."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".png":
+        return "png"
+    if ext == ".gif":
+        return "gif"
+    return "ffmpeg"
+
+
+def check_output(path):
+    """Raise ValueError if `path` can't be written here (no Pillow, or no ffmpeg for video files)."""
+    try:
+        import PIL  # type: ignore  # noqa: F401
+    except ImportError:
+        raise ValueError("--video needs Pillow (pip install pillow).")
+    if output_format(path) == "ffmpeg" and shutil.which("ffmpeg") is None:
+        raise ValueError(f"--video {path}: ffmpeg not found; use a .gif or .png output instead.")
+
+
+class FrameRenderer(object):
+    """Draws units, blocks and the background into a reused RGB image."""
+    def __init__(self, width, height, kinds_order, emoji, background="white", log=None):
+        from PIL import Image  # type: ignore
+        self.size = (int(width), int(height))
+        self.log = log if log is not None else (lambda msg: None)
+        self.background, self.block_color = self._load_background(background)
+        self.sprites = self._make_sprites(kinds_order, emoji)
+        self.base = self.background
+        self.frame = Image.new("RGB", self.size)
+        self.offset = SPRITE_SIZE // 2
+
+    def _load_background(self, source):
+        """Return (RGB image, default block color) for a color or an image file."""
+        from PIL import Image, ImageStat  # type: ignore
+        if isinstance(source, str) and os.path.isfile(source):
+            try:
+                img = Image.open(source).convert("RGB").resize(self.size, Image.LANCZOS)
+                means = ImageStat.Stat(img).mean
+                return img, pick_contrast_color_from_rgb(tuple(int(m) for m in means))
+            except Exception as e:
+                self.log(f"warning: failed to load background image '{source}': {e}. Using white.")
+                source = "white"
+        rgb = _rgb_from_name_or_hex(source)
+        if rgb is None:
+            self.log(f"warning: background '{source}' not recognized for video frames, using white.")
+            rgb = (255, 255, 255)
+        return Image.new("RGB", self.size, rgb), pick_contrast_color_from_rgb(rgb)
+
+    def _make_sprites(self, kinds_order, emoji):
+        """RGBA sprite per kind: the rasterized emoji, or a colored disc without an emoji font."""
+        from PIL import Image, ImageDraw  # type: ignore
+        font = load_emoji_font()
+        sprites = {}
+        if font is not None:
+            for kind in kinds_order:
+                img = rasterize_emoji(emoji[kind], font)
+                if img is None:
+                    break
+                sprites[kind] = img
+            else:
+                return sprites
+        self.log("warning: no color emoji font found; video frames show units as colored discs.")
+        for i, kind in enumerate(kinds_order):
+            img = Image.new("RGBA", (SPRITE_SIZE, SPRITE_SIZE), (0, 0, 0, 0))
+            ImageDraw.Draw(img).ellipse((2, 2, SPRITE_SIZE - 3, SPRITE_SIZE - 3),
+                                        fill=_FALLBACK_COLORS[i % len(_FALLBACK_COLORS)])
+            sprites[kind] = img
+        return sprites
+
+    def begin_game(self, blocks):
+        """Composite this game's blocks onto the background (the base of every frame)."""
+        from PIL import ImageDraw  # type: ignore
+        self.base = self.background.copy()
+        draw = ImageDraw.Draw(self.base)
+        for b in blocks:
+            color = b.get("color") or self.block_color
+            draw.rectangle((b["x1"], b["y1"], b["x2"], b["y2"]), fill=color, outline=color)
+
+    def render(self, units):
+        """Draw `units` over the base; returns the (reused) frame image."""
+        frame = self.frame
+        frame.paste(self.base)
+        sprites = self.sprites
+        off = self.offset
+        for u in units:
+            sprite = sprites[u.kind]
+            frame.paste(sprite, (int(u.x) - off, int(u.y) - off), sprite)
+        return frame
+
+
+def _encode(frames, path, size, fps):
+    """Encoder process: write frames (RGB bytes) from the queue until None arrives."""
+    from PIL import Image  # type: ignore
+    fmt = output_format(path)
+    pattern = path
+    if fmt == "png" and "%" not in path:
+        root, ext = os.path.splitext(path)
+        pattern = root + "_%06d" + ext
+    proc = None
+    if fmt == "ffmpeg":
+        proc = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", str(fps),
+             "-i", "-", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE)
+    gif = []
+    n = 0
+    while True:
+        data = frames.get()
+        if data is None:
+            break
+        if fmt == "png":
+            Image.frombytes("RGB", size, data).save(pattern % n)
+        elif fmt == "gif":
+            gif.append(Image.frombytes("RGB", size, data).convert("P", palette=Image.ADAPTIVE))
+        else:
+            proc.stdin.write(data)
+        n += 1
+    if proc is not None:
+        proc.stdin.close()
+        proc.wait()
+    elif gif:
+        gif[0].save(path, save_all=True, append_images=gif[1:],
+                    duration=max(1, int(round(1000.0 / fps))), loop=0)
+
+
+class VideoWriter(object):
+    """Streams frames to an encoder process writing `path` (format from its extension)."""
+    def __init__(self, path, size, fps=30):
+        self.path = path
+        self.size = tuple(size)
+        self.frames = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.queue = multiprocessing.Queue(maxsize=_FRAME_QUEUE_SIZE)
+        self.process = multiprocessing.Process(target=_encode, args=(self.queue, path, self.size, fps),
+                                               name="rpsarena-video", daemon=True)
+        self.process.start()
+
+    def add(self, image):
+        self._put(image.tobytes())
+        self.frames += 1
+
+    def _put(self, item):
+        while True:
+            try:
+                self.queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                if not self.process.is_alive():
+                    raise RuntimeError(f"video encoder for '{self.path}' exited early")
+
+    def close(self):
+        """Finish encoding and wait for the file to be written."""
+        if self.process is None:
+            return
+        self._put(None)
+        self.process.join()
+        self.process = None